@@ -1,48 +1,168 @@
+import os
+import time
+import shutil
+import pickle
+import hashlib
+import tempfile
+import warnings
 import pandas as pd
-import pandasdmx as pdmx
 import numpy as np
 import matplotlib.pyplot as plt
 import ipywidgets as widgets
 import geopandas as gpd
 from mpl_toolkits.axes_grid1.axes_divider import make_axes_locatable
-from IPython.display import HTML
+from IPython.display import HTML, display
+
+# where fetched and cleaned frames are cached, where recorded fixtures live, and where the synthetic stand-ins live
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),'__datacache__')
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),'fixtures')
+SYNTHETIC_DIR = os.path.join(FIXTURE_DIR,'synthetic')
+
+# Natural Earth 1:110m countries, from https://www.naturalearthdata.com/downloads/110m-cultural-vectors/
+WORLDMAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),'ne_110m_admin_0_countries.zip')
+
+# columns with ISO3 country codes, in order of preference
+ISO3_COLUMNS = ('ADM0_A3','ISO_A3','iso_a3')
+
+# bump to invalidate every cached frame, e.g. when the cleaning changes
+CACHE_VERSION = 1
+
+# cached frames older than this many seconds are fetched again
+TTL = 7*24*60*60
+
+# 'cache': use fresh cached frames, 'online': always fetch, 'offline': replay fixtures, 'record': fetch and save fixtures
+MODE = os.environ.get('DATAPROJECT_MODE','cache')
+
+COUNTRIES = ['AUS','AUT','BEL','CAN','CHL','COL','CRI','CZE','DNK','EST','FIN','FRA','DEU','GRC','HUN','ISL','IRL','ISR','ITA',
+             'JPN','KOR','LVA','LTU','LUX','MEX','NLD','NZL','NOR','POL','PRT','SVK','SVN','ESP','SWE','CHE','TUR','GBR','USA']
+
+def sdmx_key(*dimensions):
+    """ Build an SDMX key string from lists of dimension values """
+
+    return '.'.join('+'.join(values) if isinstance(values,(list,tuple)) else values for values in dimensions)
+
+# Set out everything about the requests in the format specified by the OECD API
+EMPLRATE_KEY = sdmx_key(COUNTRIES, ['LREM64FE','LREM64MA','LREM64TT'], 'STSA', 'A')
+HOURS_KEY = sdmx_key(COUNTRIES, 'T_HRSAV', 'PEHRS')
+
+def cache_path(directory, name, *parts, versioned=True):
+    """ Path of a cached frame, named by a hash of what it was fetched with """
+
+    parts = (CACHE_VERSION,name)+parts if versioned else (name,)+parts
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+    extension = 'parquet' if has_pyarrow() else 'pkl'
+    return os.path.join(directory, f'{name}-{digest}.{extension}')
+
+def has_pyarrow():
+    """ Check if Parquet files can be written """
+
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+    return True
+
+def read_frame(path, ttl=None, geo=False):
+    """ Read a cached frame, None if it is missing or older than ttl seconds """
+
+    if not os.path.exists(path) or (ttl is not None and time.time()-os.path.getmtime(path) > ttl):
+        return None
+
+    if path.endswith('.parquet'):
+        return gpd.read_parquet(path) if geo else pd.read_parquet(path)
+    with open(path,'rb') as f:
+        return pickle.load(f)
+
+def write_frame(frame, path):
+    """ Write a frame to Parquet, or pickle if pyarrow is not installed """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # write to a temporary file first so a crash cannot leave a broken cache
+    tmp = f'{path}.{os.getpid()}.tmp'
+    if path.endswith('.parquet'):
+        frame.to_parquet(tmp)
+    else:
+        with open(tmp,'wb') as f:
+            pickle.dump(frame, f)
+    os.replace(tmp, path)
+
+def fetch_oecd(resource_id, key, start, end, mode=None, ttl=TTL):
+    """ Fetch a dataset from the OECD API as a flat frame, through the cache """
+
+    mode = MODE if mode is None else mode
+    # fixtures are raw responses and outlive changes of CACHE_VERSION
+    fixture = cache_path(FIXTURE_DIR, resource_id, key, start, end, versioned=False)
+
+    # a. offline replay from recorded fixtures, or from the synthetic ones with a warning
+    if mode == 'offline':
+        raw = read_frame(fixture)
+        if raw is None:
+            synthetic = cache_path(SYNTHETIC_DIR, resource_id, key, start, end, versioned=False)
+            raw = read_frame(synthetic)
+            if raw is None:
+                raise FileNotFoundError(f'no fixture for {resource_id} at {fixture}, record one with mode="record"')
+            warnings.warn(f'replaying synthetic data for {resource_id} from {synthetic}, record real data with mode="record"')
+        return raw
+
+    # b. fresh cached response
+    path = cache_path(CACHE_DIR, resource_id, key, start, end)
+    if mode == 'cache':
+        raw = read_frame(path, ttl)
+        if raw is not None:
+            return raw
+    elif mode not in ('online','record'):
+        raise ValueError(f'unknown mode: {mode}')
+
+    # c. fetch, only now is pandasdmx needed
+    import pandasdmx as pdmx
+    oecd = pdmx.Request("OECD")
+    raw = pd.DataFrame(oecd.data(resource_id=resource_id, key=f'{key}/all?startTime={start}&endTime={end}').to_pandas()).reset_index()
 
-def fetching_data_emplrate():
-    """ Import and clean data on employment rates """ 
+    write_frame(raw, path)
+    if mode == 'record':
+        write_frame(raw, fixture)
 
-    # Tell pdmx we want OECD data
-    oecd = pdmx.Request("OECD")
+    return raw
+
+def cached(name, clean, resource_id, key, start, end, mode=None, ttl=TTL):
+    """ Fetch a dataset and clean it, caching the cleaned frame """
+
+    mode = MODE if mode is None else mode
+
+    # fixtures are cleaned every time, so replays follow changes to the cleaning
+    if mode == 'offline':
+        return clean(fetch_oecd(resource_id, key, start, end, mode=mode))
 
-    # Set out everything about the request in the format specified by the OECD API
-    data_emplrate = oecd.data(
-        resource_id="STLABOUR",
-        key="AUS+AUT+BEL+CAN+CHL+COL+CRI+CZE+DNK+EST+FIN+FRA+DEU+GRC+HUN+ISL+IRL+ISR+ITA+JPN+KOR+LVA+LTU+LUX+MEX+NLD+NZL+NOR+POL+PRT+SVK+SVN+ESP+SWE+CHE+TUR+GBR+USA.LREM64FE+LREM64MA+LREM64TT.STSA.A/all?startTime=2008&endTime=2022",
-    ).to_pandas()
+    path = cache_path(CACHE_DIR, name, resource_id, key, start, end)
+    if mode == 'cache':
+        frame = read_frame(path, ttl)
+        if frame is not None:
+            return frame
 
-    emplrate = pd.DataFrame(data_emplrate).reset_index()
+    frame = clean(fetch_oecd(resource_id, key, start, end, mode=mode, ttl=ttl))
+    write_frame(frame, path)
+
+    return frame
+
+def clean_emplrate(data_emplrate):
+    """ Clean data on employment rates """
+
+    emplrate = data_emplrate.copy()
 
     # Drop measure and frequency
     emplrate.drop(['MEASURE', 'FREQUENCY'], axis=1, inplace=True) 
 
     # Rename 
     emplrate.rename(columns = {'TIME_PERIOD':'YEAR', 'value':'EMPLRATE'}, inplace=True)
-    emplrate['SUBJECT'].replace({'LREM64FE': 'Female', 'LREM64MA': 'Male', 'LREM64TT': 'All'}, inplace=True)
+    emplrate['SUBJECT'] = emplrate['SUBJECT'].replace({'LREM64FE': 'Female', 'LREM64MA': 'Male', 'LREM64TT': 'All'})
 
     return emplrate
 
-def fetching_data_hours():
-    """ Import and clean data on average hours worked per person employed """ 
-    
-    # Tell pdmx we want OECD data
-    oecd = pdmx.Request("OECD")
-    
-    # Set out everything about the request in the format specified by the OECD API
-    data_hours = oecd.data(
-        resource_id="PDB_LV",
-        key="AUS+AUT+BEL+CAN+CHL+COL+CRI+CZE+DNK+EST+FIN+FRA+DEU+GRC+HUN+ISL+IRL+ISR+ITA+JPN+KOR+LVA+LTU+LUX+MEX+NLD+NZL+NOR+POL+PRT+SVK+SVN+ESP+SWE+CHE+TUR+GBR+USA.T_HRSAV.PEHRS/all?startTime=2008&endTime=2022",
-    ).to_pandas()
+def clean_hours(data_hours):
+    """ Clean data on average hours worked per person employed """
 
-    hours = pd.DataFrame(data_hours).reset_index()
+    hours = data_hours.copy()
 
     # Drop subject and measure
     hours.drop(['SUBJECT', 'MEASURE'], axis=1, inplace=True) 
@@ -52,59 +172,164 @@ def fetching_data_hours():
 
     return hours
 
+def fetching_data_emplrate(start=2008, end=2022, mode=None, ttl=TTL):
+    """ Import and clean data on employment rates """ 
+
+    return cached('emplrate', clean_emplrate, 'STLABOUR', EMPLRATE_KEY, start, end, mode=mode, ttl=ttl)
+
+def fetching_data_hours(start=2008, end=2022, mode=None, ttl=TTL):
+    """ Import and clean data on average hours worked per person employed """ 
+    
+    return cached('hours', clean_hours, 'PDB_LV', HOURS_KEY, start, end, mode=mode, ttl=ttl)
+
+def split_key(key, start, end, by='country', size=10):
+    """ Split a request into (key, start, end) chunks of size countries or size years """
+
+    if by == 'country':
+        dimensions = key.split('.')
+        countries = dimensions[0].split('+')
+        return [(sdmx_key(countries[i:i+size], *dimensions[1:]), start, end) for i in range(0, len(countries), size)]
+    elif by == 'period':
+        return [(key, year, min(year+size-1, end)) for year in range(start, end+1, size)]
+    else:
+        raise ValueError(f'unknown split: {by}')
+
+def write_panel_dataset(directory, start=2008, end=2022, by='country', size=10, mode=None, ttl=TTL):
+    """ Fetch, clean and merge the panel chunk by chunk into Parquet files partitioned by country """
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # Only replace an earlier panel dataset, never another directory
+    directory = os.path.normpath(directory)
+    if os.path.exists(directory) and any(not name.startswith('LOCATION=') for name in os.listdir(directory)):
+        raise ValueError(f'{directory} is not a panel dataset, not replacing it')
+
+    # Write into a fresh directory of its own next to the target that replaces it at the end, so no files of an earlier run survive
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f'{os.path.basename(directory)}.', suffix='.tmp', dir=parent)
+
+    # Both datasets are split the same way, so their chunks cover the same countries and years
+    chunks = zip(split_key(EMPLRATE_KEY, start, end, by, size), split_key(HOURS_KEY, start, end, by, size))
+
+    try:
+        for n, ((key_emplrate, chunk_start, chunk_end), (key_hours, _, _)) in enumerate(chunks):
+
+            # Only one chunk of each dataset is in memory at a time
+            emplrate = clean_emplrate(fetch_oecd('STLABOUR', key_emplrate, chunk_start, chunk_end, mode=mode, ttl=ttl))
+            hours = clean_hours(fetch_oecd('PDB_LV', key_hours, chunk_start, chunk_end, mode=mode, ttl=ttl))
+            chunk = pd.merge(emplrate, hours, how='inner', on=['LOCATION', 'YEAR'], validate='many_to_one').astype({'YEAR': int})
+
+            # Chunks split by period write to the same country partitions, the chunk number keeps their files apart
+            ds.write_dataset(pa.Table.from_pandas(chunk, preserve_index=False), tmp, format='parquet',
+                             partitioning=['LOCATION'], partitioning_flavor='hive',
+                             basename_template=f'chunk{n}-{{i}}.parquet', existing_data_behavior='overwrite_or_ignore')
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    # Swap in the new panel and remove the earlier one, moved into a fresh directory of its own first
+    if os.path.exists(directory):
+        old = tempfile.mkdtemp(prefix=f'{os.path.basename(directory)}.', suffix='.old', dir=parent)
+        os.replace(directory, os.path.join(old, 'panel'))
+        os.replace(tmp, directory)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, directory)
+
+    return directory
+
+def panel_dataset(directory):
+    """ Open a panel written by write_panel_dataset without reading it """
+
+    import pyarrow.dataset as ds
+    return ds.dataset(directory, format='parquet', partitioning='hive')
+
+def aggregate_panel(directory, columns, by, filter=None):
+    """ Mean, max and min of columns by groups, read batch by batch from a panel dataset """
+
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    by = [by] if isinstance(by, str) else list(by)
+
+    # Partial sums, counts, maxima and minima are combined after every batch, so memory is bounded by the number of groups
+    how = {f'{column}_{stat}': 'sum' if stat in ('sum', 'count') else stat for column in columns for stat in ('sum', 'count', 'max', 'min')}
+    totals = None
+    for batch in panel_dataset(directory).to_batches(columns=by+columns, filter=filter):
+        partial = batch.to_pandas().groupby(by, observed=True)[columns].agg(['sum', 'count', 'max', 'min'])
+        partial.columns = [f'{column}_{stat}' for column, stat in partial.columns]
+        totals = partial if totals is None else pd.concat([totals, partial]).groupby(level=by).agg(how)
+
+    # Same layout as the statistics cube, one block of columns per variable
+    return pd.concat({column: pd.DataFrame({
+        'mean': totals[f'{column}_sum']/totals[f'{column}_count'],
+        'max': totals[f'{column}_max'],
+        'min': totals[f'{column}_min'],
+    }) for column in columns}, axis=1)
+
+def load_panel(directory, filter=None):
+    """ Read the rows of a panel dataset that match filter into an indexed panel """
+
+    return to_panel(panel_dataset(directory).to_table(filter=filter).to_pandas())
+
 def format_float(value):
     """ Set format for decimals """ 
 
     return "{:.2f}".format(value)
 
-def table(emplrate, hours):
+def describe(data, column, by, year=2022):
+    """ Mean, max, min, the years of the max and min and the value in year of a column for every group """
+
+    # Years are strings in the fetched data, compare them as integers
+    data = data.reset_index() if 'YEAR' not in data.columns else data
+    data = data.dropna(subset=[column])
+    years = data['YEAR'].astype(int)
+
+    # One groupby pass computes every statistic, idxmax and idxmin give the rows to read the years from
+    stats = data.groupby(by, observed=True)[column].agg(['mean', 'max', 'min', 'idxmax', 'idxmin'])
+    stats['max_year'] = years.loc[stats.pop('idxmax')].to_numpy()
+    stats['min_year'] = years.loc[stats.pop('idxmin')].to_numpy()
+
+    # The value in the chosen year
+    stats['value'] = data[years == year].groupby(by, observed=True)[column].first()
+
+    return stats
+
+def stats_cube(emplrate, hours, year=2022):
+    """ Precompute descriptive statistics for every country and subject """
+
+    # Employment rate statistics by country and gender
+    stats_emplrate = describe(emplrate, 'EMPLRATE', ['LOCATION', 'SUBJECT'], year)
+
+    # Hours are not divided by gender, so the country statistics are repeated for every gender
+    stats_hours = describe(hours, 'AVHRS', 'LOCATION', year)
+    stats_hours = stats_hours.reindex(stats_emplrate.index.get_level_values('LOCATION')).set_axis(stats_emplrate.index)
+
+    return pd.concat({'EMPLRATE': stats_emplrate, 'AVHRS': stats_hours}, axis=1)
+
+def table(emplrate, hours, cube=None):
     """ Create a table of descriptive statistics """ 
 
+    if cube is None:
+        cube = stats_cube(emplrate, hours)
+
+    def stats_frame(stats, name):
+        year = lambda value: '' if pd.isna(value) else int(value)
+        return pd.DataFrame({
+            'Statistic': [f'Mean {name}', f'Max {name}', f'Min {name}'],
+            'Value': [stats['mean'], stats['max'], stats['min']],
+            'Year': ['', year(stats['max_year']), year(stats['min_year'])]
+        })
+
     def descriptive_stats(country, gender):
         pd.options.display.float_format = format_float
     
-        # Filter data for the selected country and gender
-        country_gender_data_empl = emplrate[(emplrate['LOCATION'] == country) & (emplrate['SUBJECT'] == gender)]
-        country_data_hours = hours[hours['LOCATION'] == country]
-
-        # Employment Rate statistics
-        mean_emplrate = country_gender_data_empl['EMPLRATE'].mean()
-        max_emplrate = country_gender_data_empl['EMPLRATE'].max()
-        min_emplrate = country_gender_data_empl['EMPLRATE'].min()
-        max_year_empl = country_gender_data_empl[country_gender_data_empl['EMPLRATE'] == max_emplrate]['YEAR'].iloc[0]
-        min_year_empl = country_gender_data_empl[country_gender_data_empl['EMPLRATE'] == min_emplrate]['YEAR'].iloc[0]
-
-        # Hours Worked statistics
-        mean_hours = country_data_hours['AVHRS'].mean()
-        max_hours = country_data_hours['AVHRS'].max()
-        min_hours = country_data_hours['AVHRS'].min()
-        max_year_hours = country_data_hours[country_data_hours['AVHRS'] == max_hours]['YEAR'].iloc[0]
-        min_year_hours = country_data_hours[country_data_hours['AVHRS'] == min_hours]['YEAR'].iloc[0]
+        # Look up the precomputed statistics for the selected country and gender
+        stats = cube.loc[(country, gender)]
 
         # Prepare data for display
-        stats_emplrate = pd.DataFrame({
-            'Statistic': [
-               'Mean Employment Rate', 'Max Employment Rate', 'Min Employment Rate'
-            ],
-            'Value': [
-                mean_emplrate, max_emplrate, min_emplrate
-            ],
-            'Year': [
-                '', max_year_empl, min_year_empl
-            ]
-        })
-
-        stats_hours = pd.DataFrame({
-            'Statistic': [
-                'Mean Employment Rate', 'Max Employment Rate', 'Min Employment Rate'
-            ],
-            'Value': [
-                mean_emplrate, max_emplrate, min_emplrate
-            ],
-            'Year': [
-                '', max_year_empl, min_year_empl
-            ]
-        })
+        stats_emplrate = stats_frame(stats['EMPLRATE'], 'Employment Rate')
+        stats_hours = stats_frame(stats['AVHRS'], 'Hours Worked')
 
         # Display the DataFrames side by side
         html = (
@@ -124,26 +349,70 @@ def table(emplrate, hours):
     return widgets.interactive(descriptive_stats, country=country_dropdown, gender=gender_dropdown)
 
 
+# country shapes loaded in this session, by cache path
+worldmaps = {}
+
+def worldmap_source(path=None):
+    """ Path of the country shapes, the local file or else the dataset shipped with geopandas before 1.0 """
+
+    path = WORLDMAP_PATH if path is None else path
+    if os.path.exists(path):
+        return path
+
+    try:
+        return gpd.datasets.get_path('naturalearth_lowres')
+    except AttributeError as err:
+        raise FileNotFoundError(f'no country shapes at {path}, download ne_110m_admin_0_countries.zip from https://www.naturalearthdata.com/downloads/110m-cultural-vectors/') from err
+
+def load_worldmap(path=None, tolerance=0.1):
+    """ Country shapes indexed by ISO3 code and simplified to tolerance degrees, cached in memory and on disk """
+
+    path = worldmap_source(path)
+    cache = cache_path(CACHE_DIR, 'worldmap', path, os.path.getmtime(path), tolerance)
+
+    # Loaded before in this session
+    if cache in worldmaps:
+        return worldmaps[cache]
+
+    # Loaded before in an earlier session
+    worldmap = read_frame(cache, geo=True)
+
+    # Read the shapes, keep the ISO3 code as the index to join on and simplify to what a map of the world can show
+    if worldmap is None:
+        shapes = gpd.read_file(path)
+        iso3 = next(column for column in ISO3_COLUMNS if column in shapes.columns)
+        worldmap = gpd.GeoDataFrame({'ISO3': shapes[iso3].to_numpy()}, geometry=shapes.geometry.simplify(tolerance).to_numpy(), crs=shapes.crs).set_index('ISO3')
+        write_frame(worldmap, cache)
+
+    worldmaps[cache] = worldmap
+
+    return worldmap
+
+def plot_worldmap(mapdata, column, label, title, vmin, vmax):
+    """ Plot a column of the world map """
+
+    fig, ax = plt.subplots(1, 1, figsize=(20, 16))
+    divider = make_axes_locatable(ax)
+    cax = divider.append_axes("right", size="2%", pad="0.5%")
+    mapdata.plot(column=column, ax=ax, cax=cax, cmap='OrRd', legend=True, legend_kwds={"label": label}, missing_kwds={'color':'lightgrey'}, vmin=vmin, vmax=vmax)
+    ax.set_title(title, size=20)
+    plt.show()
+
 def worldmapemp(emplrate):
     """ Create a world map of employment rates """ 
 
-    # Import world map data
-    worldmap = gpd.read_file(gpd.datasets.get_path('naturalearth_lowres'))
+    # Import world map data, the shapes are shared and only the value column is replaced
+    mapdata = load_worldmap().copy(deep=False)
 
-    def create_map_emplrate(gender):
-        # Looking at employment rates in 2022
-        emplrate_map = emplrate[(emplrate['SUBJECT'] == gender) & (emplrate['YEAR'] == '2022')]
+    # Looking at employment rates in 2022, by gender and country
+    emplrate_map = emplrate[emplrate['YEAR'].astype(int) == 2022].set_index(['SUBJECT', 'LOCATION'])['EMPLRATE'].sort_index()
 
-        # Merge employment rate data and world map data
-        mapdata_emplrate = pd.merge(worldmap, emplrate_map, how="left", left_on='iso_a3', right_on='LOCATION')
+    def create_map_emplrate(gender):
+        # Join the employment rates of the gender on the ISO3 index of the map
+        mapdata['EMPLRATE'] = emplrate_map.loc[gender].reindex(mapdata.index).to_numpy()
 
         # Plot the map
-        fig, ax = plt.subplots(1, 1, figsize=(20, 16))
-        divider = make_axes_locatable(ax)
-        cax = divider.append_axes("right", size="2%", pad="0.5%")
-        mapdata_emplrate.plot(column="EMPLRATE", ax=ax, cax=cax, cmap='OrRd', legend=True, legend_kwds={"label": f"Employment rate in 2022 for {gender} (%)"}, missing_kwds={'color':'lightgrey'}, vmin=45, vmax=85)
-        ax.set_title(f'Employment rate for OECD countries in 2022', size=20)
-        plt.show()
+        plot_worldmap(mapdata, 'EMPLRATE', f"Employment rate in 2022 for {gender} (%)", 'Employment rate for OECD countries in 2022', 45, 85)
 
     # Dropdown menu 
     gender_dropdown = widgets.Dropdown(options=['All', 'Male', 'Female'], value='All', description='Gender:')
@@ -154,32 +423,117 @@ def worldmaphours(hours):
     """ Create a world map of average hours worked per person employed """ 
 
     # Import world map data
-    worldmap = gpd.read_file(gpd.datasets.get_path('naturalearth_lowres'))
-
-    # Looking at working hours in 2022
-    hours_map = hours[hours['YEAR'] == '2022']
+    mapdata = load_worldmap().copy(deep=False)
 
-    # Merge employment rate data and world map data
-    mapdata_hours = pd.merge(worldmap, hours_map, how="left", left_on='iso_a3', right_on='LOCATION')
+    # Looking at working hours in 2022, joined on the ISO3 index of the map
+    hours_map = hours[hours['YEAR'].astype(int) == 2022].set_index('LOCATION')['AVHRS']
+    mapdata['AVHRS'] = hours_map.reindex(mapdata.index).to_numpy()
 
     # Plot the map
-    fig, ax = plt.subplots(1, 1, figsize=(20, 16))
-    divider = make_axes_locatable(ax)
-    cax = divider.append_axes("right", size="2%", pad="0.5%")
-    mapdata_hours.plot(column="AVHRS", ax=ax, cax=cax, cmap='OrRd', legend=True, legend_kwds={"label": f"Average working hours per person employed (hours per year)"}, missing_kwds={'color':'lightgrey'}, vmin=1400, vmax=2000)
-    ax.set_title(f'Average working hours per person employed in OECD countries in 2022', size=20)
-    plt.show()
+    plot_worldmap(mapdata, 'AVHRS', "Average working hours per person employed (hours per year)", 'Average working hours per person employed in OECD countries in 2022', 1400, 2000)
 
-def index(data_merged):
-    """ Create an index for average hours worked per person employed """ 
+def merge_panel(emplrate, hours):
+    """ Merge employment rates and working hours into a panel indexed by country, gender and year """
+
+    # Many-to-one inner merge, hours are the same for every gender
+    return to_panel(pd.merge(emplrate, hours, how='inner', on=['LOCATION', 'YEAR'], validate='many_to_one'))
+
+def to_panel(data):
+    """ Index a merged frame by country, gender and year """
+
+    # Categorical countries and genders, integer years
+    panel = data.astype({'LOCATION': 'category', 'SUBJECT': 'category', 'YEAR': int})
+
+    # A sorted index makes slices index lookups instead of scans
+    return panel.set_index(['LOCATION', 'SUBJECT', 'YEAR']).sort_index()
+
+def panel_series(panel, column, location, subject='All'):
+    """ A column across years for a country and gender """
+
+    return panel.loc[(location, subject), column]
+
+def panel_year(panel, year, subject='All'):
+    """ All countries in a year for a gender """
+
+    return panel.xs((subject, year), level=['SUBJECT', 'YEAR'])
+
+def panel_locations(panel):
+    """ Countries in the panel, in sorted order """
+
+    return panel.index.get_level_values('LOCATION').unique().tolist()
 
-    # We use the following method to take account of the fact that some countries do not have data for average working hours in 2008. The index for these will be NaN.
-    # Create the baseline and add it as a column to the dataset
-    baseline_avhrs_2008 = data_merged[data_merged['YEAR'] == '2008'].groupby('LOCATION')['AVHRS'].first()
-    data_merged['baseline_avhrs'] = data_merged['LOCATION'].map(baseline_avhrs_2008)
+def group_pick(values, years, groups, ngroups, mask, latest):
+    """ Year and value of the latest or earliest row in mask of every group, NaN for groups without such rows """
 
-    # Compute the index
-    data_merged['AVHRS_index'] = (data_merged['AVHRS'] / data_merged['baseline_avhrs'])*100
+    rows = pd.DataFrame({'group': groups[mask], 'year': years[mask], 'value': values[mask]})
+
+    # One hashed groupby pass, idxmax and idxmin give the first row in case of ties
+    grouped = rows.groupby('group')['year']
+    picked = rows.loc[grouped.idxmax() if latest else grouped.idxmin()]
+
+    year = np.full(ngroups, np.nan)
+    value = np.full(ngroups, np.nan)
+    year[picked['group']] = picked['year']
+    value[picked['group']] = picked['value']
+
+    return year, value
+
+def baseline(values, years, groups, ngroups, base_year, fallback):
+    """ Value of every group in the base year, with a fallback where it is missing """
+
+    valid = ~np.isnan(values)
+
+    # a. Nearest observations at or before and at or after the base year
+    year_before, value_before = group_pick(values, years, groups, ngroups, valid & (years <= base_year), latest=True)
+    year_after, value_after = group_pick(values, years, groups, ngroups, valid & (years >= base_year), latest=False)
+
+    # b. Observed in the base year
+    base = np.where(year_before == base_year, value_before, np.nan)
+
+    # c. Fallbacks where the base year is missing
+    if fallback == 'first':
+        year_first, value_first = group_pick(values, years, groups, ngroups, valid, latest=False)
+        base = np.where(np.isnan(base), value_first, base)
+    elif fallback == 'interpolate':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = (base_year-year_before)/(year_after-year_before)
+        base = np.where(np.isnan(base), value_before+weight*(value_after-value_before), base)
+    elif fallback != 'nan':
+        raise ValueError(f'unknown fallback: {fallback}')
+
+    return base
+
+def rebase(frame, columns, base_years, by='LOCATION', fallback='nan'):
+    """ Index columns to 100 in base years within groups, as a new frame """
+
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    base_years = [base_years] if np.ndim(base_years) == 0 else list(base_years)
+
+    # a. Year and group of every row, YEAR and the grouping keys can be columns or index levels
+    years = np.asarray(frame.index.get_level_values('YEAR') if 'YEAR' in frame.index.names else frame['YEAR']).astype(int)
+    groups = frame.groupby(by, observed=True, sort=False).ngroup().to_numpy(dtype=float)
+
+    # b. Rows with a missing grouping key belong to no group, they are left out of the baselines and get a NaN index
+    keyed = ~np.isnan(groups)
+    groups = np.where(keyed, groups, 0).astype(int)
+    ngroups = groups.max()+1 if len(groups) > 0 else 0
+
+    # c. One index column per column and base year, named COLUMN_index or COLUMN_index_YEAR for several base years
+    rebased = frame.copy()
+    for column in columns:
+        values = frame[column].to_numpy(dtype=float)
+        for base_year in base_years:
+            base = baseline(np.where(keyed, values, np.nan), years, groups, ngroups, base_year, fallback)
+            name = f'{column}_index' if len(base_years) == 1 else f'{column}_index_{base_year}'
+            rebased[name] = np.where(keyed, values/base[groups]*100, np.nan)
+
+    return rebased
+
+def index(data_merged, fallback='nan'):
+    """ Create an index for average hours worked per person employed """ 
+
+    # Some countries do not have data for average working hours in 2008. The index for these will be NaN unless another fallback is chosen.
+    return rebase(data_merged, 'AVHRS', 2008, by='LOCATION', fallback=fallback)
 
 def plotacrosstime(data_merged):
     """ Plot the index across time """ 
@@ -189,9 +543,8 @@ def plotacrosstime(data_merged):
         fig = plt.figure(figsize=(10, 6))
         ax = fig.add_subplot(1, 1, 1)
         for location in selected_locations:
-            ax.plot(data_merged[(data_merged['LOCATION'] == location) & (data_merged['SUBJECT'] == 'All')]['YEAR'], 
-                    data_merged[(data_merged['LOCATION'] == location) & (data_merged['SUBJECT'] == 'All')]['AVHRS_index'], 
-                    label=location)
+            avhrs_index = panel_series(data_merged, 'AVHRS_index', location)
+            ax.plot(avhrs_index.index, avhrs_index, label=location)
         ax.set_xlabel('Year')
         ax.set_ylabel('Indexed average hours worked per person employed (2008 = 100)')
         ax.set_title('Indexed average hours worked per person employed across time')
@@ -199,43 +552,50 @@ def plotacrosstime(data_merged):
         plt.show()
 
     # Create checkboxes for selecting LOCATION
-    locations_checkbox = {location: widgets.Checkbox(value=(location == 'DNK' or i < 3), description=location) for i, location in enumerate(data_merged['LOCATION'].unique())}
+    locations_checkbox = {location: widgets.Checkbox(value=(location == 'DNK' or i < 3), description=location) for i, location in enumerate(panel_locations(data_merged))}
 
     return widgets.interactive(time_plot, **locations_checkbox)
 
-def scatterplot(data_merged):
+def values_2022(data_merged, cube, subject):
+    """ Employment rates and working hours in 2022 for a gender, from the cube or else the panel """
+
+    if cube is None:
+        return panel_year(data_merged, 2022, subject)[['EMPLRATE', 'AVHRS']]
+
+    return cube.xs(subject, level='SUBJECT').xs('value', axis=1, level=1)
+
+def scatterplot(data_merged, cube=None):
     """ Creates a scatter plot of employment rates against working hours """
 
+    # Values in 2022 for countries with both employment rates and working hours
+    data_2022 = values_2022(data_merged, cube, 'All').dropna()
+
     # Create the figure
     plt.figure(figsize=(10, 6))
-    plt.scatter(x=data_merged[(data_merged['SUBJECT'] == 'All') & (data_merged['YEAR'] == '2022')]['AVHRS'], 
-                y=data_merged[(data_merged['SUBJECT'] == 'All') & (data_merged['YEAR'] == '2022')]['EMPLRATE'])
+    plt.scatter(x=data_2022['AVHRS'], y=data_2022['EMPLRATE'])
 
     plt.xlabel('Average hours worked per person employed (hours per year)')
     plt.ylabel('Employment rate (%)')
-    plt.title('Scatter plot of employment rate against average working hours across OECD countries in 2022')
+    plt.title('Scatter plot of employment rates against average working hours across OECD countries in 2022')
 
     # Annotate points with country names
-    for index, row in data_merged[(data_merged['SUBJECT'] == 'All') & (data_merged['YEAR'] == '2022')].iterrows():
-        plt.annotate(row['LOCATION'], (row['AVHRS'], row['EMPLRATE']))
+    for location, row in data_2022.iterrows():
+        plt.annotate(location, (row['AVHRS'], row['EMPLRATE']))
 
     plt.show()
 
-def barchart(data_merged):
+def barchart(data_merged, cube=None):
     """ Creates a bar chart of employment rates for males and females, respectively """
 
     def update_plot(gender):
         plt.figure(figsize=(10, 6))
         
-        # Filter data for the selected gender and year
-        filtered_data = data_merged[(data_merged['YEAR'] == '2022') & (data_merged['SUBJECT'] == gender)]
-
-        # Sort the data in descending order of employment rate
-        sorted_data = filtered_data.sort_values(by='EMPLRATE', ascending=False)
+        # Employment rates in 2022 for the selected gender, in descending order
+        sorted_data = values_2022(data_merged, cube, gender)['EMPLRATE'].dropna().sort_values(ascending=False)
 
         # Plotting the data
-        plt.bar(sorted_data['LOCATION'], sorted_data['EMPLRATE'], color='skyblue')
-        plt.bar(sorted_data[sorted_data['LOCATION'] == 'DNK']['LOCATION'], sorted_data[sorted_data['LOCATION'] == 'DNK']['EMPLRATE'], color='blue')
+        plt.bar(sorted_data.index, sorted_data, color='skyblue')
+        plt.bar(sorted_data.index[sorted_data.index == 'DNK'], sorted_data[sorted_data.index == 'DNK'], color='blue')
         
         plt.xlabel('Country')
         plt.ylabel('Employment Rate (%)')
@@ -246,4 +606,4 @@ def barchart(data_merged):
     # Create dropdown menu for selecting gender
     gender_dropdown = widgets.Dropdown(options=['Male', 'Female'], value='Female', description='Gender:')
 
-    return widgets.interactive(update_plot, gender=gender_dropdown)
\ No newline at end of file
+    return widgets.interactive(update_plot, gender=gender_dropdown)
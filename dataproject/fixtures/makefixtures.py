@@ -0,0 +1,68 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dataproject
+
+# countries without hours worked in the first years, so the 2008 index is NaN for them as in the OECD data
+LATE_HOURS = {'COL': 2010, 'CRI': 2011}
+
+def synthetic_emplrate(start=2008, end=2022, seed=2024):
+    """ Synthetic raw response of the STLABOUR request, same layout as the OECD data """
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for location in dataproject.COUNTRIES:
+
+        # Level, gender gap and trend of the country
+        level = rng.uniform(55, 78)
+        gap = rng.uniform(4, 20)
+        trend = rng.uniform(-0.1, 0.6)
+
+        for year in range(start, end+1):
+            shock = rng.normal(0, 0.8) - (2.0 if year in (2009, 2020) else 0)
+            total = level + trend*(year-start) + shock
+            for subject, value in [('LREM64FE', total-gap/2), ('LREM64MA', total+gap/2), ('LREM64TT', total)]:
+                rows.append((location, subject, 'STSA', 'A', str(year), round(value, 1)))
+
+    return pd.DataFrame(rows, columns=['LOCATION', 'SUBJECT', 'MEASURE', 'FREQUENCY', 'TIME_PERIOD', 'value'])
+
+def synthetic_hours(start=2008, end=2022, seed=2025):
+    """ Synthetic raw response of the PDB_LV request, same layout as the OECD data """
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for location in dataproject.COUNTRIES:
+
+        # Level and trend of the country
+        level = rng.uniform(1380, 2050)
+        trend = rng.uniform(-9, 1)
+
+        for year in range(LATE_HOURS.get(location, start), end+1):
+            shock = rng.normal(0, 8) - (40 if year == 2020 else 0)
+            rows.append((location, 'T_HRSAV', 'PEHRS', str(year), round(level + trend*(year-start) + shock, 0)))
+
+    return pd.DataFrame(rows, columns=['LOCATION', 'SUBJECT', 'MEASURE', 'TIME_PERIOD', 'value'])
+
+def write_fixtures(start=2008, end=2022, splits=(('country', 10),)):
+    """ Write the synthetic fixtures to SYNTHETIC_DIR under the names offline mode looks them up by, for the full requests and the chunks of splits """
+
+    for resource_id, key, raw in [('STLABOUR', dataproject.EMPLRATE_KEY, synthetic_emplrate(start, end)),
+                                  ('PDB_LV', dataproject.HOURS_KEY, synthetic_hours(start, end))]:
+
+        # The full request, and the chunks write_panel_dataset requests
+        requests = [(key, start, end)] + [chunk for by, size in splits for chunk in dataproject.split_key(key, start, end, by, size)]
+
+        for chunk_key, chunk_start, chunk_end in requests:
+            countries = chunk_key.split('.')[0].split('+')
+            years = raw['TIME_PERIOD'].astype(int)
+            chunk = raw[raw['LOCATION'].isin(countries) & (years >= chunk_start) & (years <= chunk_end)].reset_index(drop=True)
+
+            path = dataproject.cache_path(dataproject.SYNTHETIC_DIR, resource_id, chunk_key, chunk_start, chunk_end, versioned=False)
+            dataproject.write_frame(chunk, path)
+            print(f'{resource_id}: {len(chunk)} rows written to {os.path.basename(path)}')
+
+if __name__ == '__main__':
+    write_fixtures()
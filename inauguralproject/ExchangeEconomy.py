@@ -1,13 +1,193 @@
 import numpy as np
 from types import SimpleNamespace
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from scipy import optimize
 
+SWEEP_METHODS = ('find_equilibrium','Utility_max_a','Utility_max_b','pareto_optimizer','marketmaker_solver','socialplanner_solver')
+
+# solvers that can start from the solution of the previous point
+WARM_START_METHODS = ('Utility_max_b','marketmaker_solver','socialplanner_solver')
+
+def sweep_task(task):
+    """ solve a block of points of a parameter sweep in order on one fresh model """
+
+    block,methods,warm_start = task
+
+    # a. fresh model, so a block gives the same results on any worker
+    model = ExchangeEconomyClass()
+
+    results = []
+    for values in block:
+
+        # b. parameters of this point
+        for key,value in values.items():
+            setattr(model.par,key,value)
+
+        # c. run every solver, warm starting from the previous point in the block
+        result = {}
+        for method in methods:
+            if method == 'find_equilibrium':
+                result['p1_eq'] = model.find_equilibrium(do_print=False)
+            else:
+                kwargs = dict(warm_start=warm_start) if method in WARM_START_METHODS else {}
+                x1A,x2A = getattr(model,method)(do_print=False,**kwargs)
+                result[f'{method}_x1A'] = x1A
+                result[f'{method}_x2A'] = x2A
+
+                # i. evaluation counts of the SLSQP solvers, to compare cold and warm starts
+                if method in WARM_START_METHODS:
+                    sol = getattr(model.sol,method)
+                    result[f'{method}_nfev'] = sol.nfev
+                    result[f'{method}_njev'] = sol.njev
+
+        results.append(result)
+
+    return results
+
+class EndowmentSampler:
+
+    def __init__(self,seed=2000,maxsize=16):
+        """ setup sampler with its own random number generator """
+
+        self.seed = seed
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+
+    def draw(self,s,seed=None):
+        """ draw s uniformly distributed endowments (w1A,w2A) as an (s,2) array """
+
+        seed = self.seed if seed is None else seed
+        key = (seed,s)
+
+        # a. reuse earlier draw
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        # b. draw from a generator seeded for this draw only
+        rng = np.random.default_rng(seed)
+        W = rng.uniform(size=(s,2))
+        W.flags.writeable = False
+
+        # c. store and evict the least recently used draw
+        self.cache[key] = W
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+        return W
+
+    def stream(self,s,chunk=1_000_000,seed=None):
+        """ draw s endowments in chunks of at most chunk rows """
+
+        seed = self.seed if seed is None else seed
+        rng = np.random.default_rng(seed)
+
+        # the chunks are identical to the rows of draw(s,seed)
+        for start in range(0,s,chunk):
+            yield rng.uniform(size=(min(chunk,s-start),2))
+
+class EdgeworthBox:
+
+    def __init__(self,model,N=10_000):
+        """ precompute contract curve and pareto lens of the Edgeworth box of model at its current parameters """
+
+        self.model = model
+        par = self.par = SimpleNamespace(alpha=model.par.alpha,beta=model.par.beta,w1A=model.par.w1A,w2A=model.par.w2A)
+        w1A,w2A = par.w1A,par.w2A
+        self.grids = {}
+
+        # a. utility at the endowment
+        self.uA_endowment = self.utility_A(w1A,w2A)
+        self.uB_endowment = self.utility_B(1-w1A,1-w2A)
+
+        # b. contract curve on a sorted grid of x1A, utilities are monotone along it
+        self.x1A = np.linspace(0,1,N)
+        self.x2A = self.contract_curve(self.x1A)
+        self.uA = self.utility_A(self.x1A,self.x2A)
+        self.uB = self.utility_B(1-self.x1A,1-self.x2A)
+
+        # c. the core is the part of the contract curve inside the lens
+        self.x1A_core_low = np.interp(self.uA_endowment,self.uA,self.x1A)
+        self.x1A_core_high = np.interp(-self.uB_endowment,-self.uB,self.x1A)
+
+    def utility_A(self,x1A,x2A):
+        """ calculate utility of consumer A with the model at the parameters of the box """
+
+        with self.model.batch_par(**vars(self.par)):
+            return self.model.utility_A(x1A,x2A)
+
+    def utility_B(self,x1B,x2B):
+        """ calculate utility of consumer B with the model at the parameters of the box """
+
+        with self.model.batch_par(**vars(self.par)):
+            return self.model.utility_B(x1B,x2B)
+
+    def contract_curve(self,x1A):
+        """ calculate x2A on the contract curve where the marginal rates of substitution are equal """
+
+        par = self.par
+
+        a = par.beta*(1-par.alpha)
+        b = par.alpha*(1-par.beta)
+        return a*x1A/(b*(1-x1A)+a*x1A)
+
+    def best_for_A(self):
+        """ allocation in the lens with the highest utility of consumer A """
+
+        x1A = self.x1A_core_high
+        return x1A,np.interp(x1A,self.x1A,self.x2A)
+
+    def in_lens(self,x1A,x2A):
+        """ check if allocations make both consumers weakly better off """
+
+        return (self.utility_A(x1A,x2A) >= self.uA_endowment) & (self.utility_B(1-x1A,1-x2A) >= self.uB_endowment)
+
+    def distance_to_contract_curve(self,x1A,x2A):
+        """ vertical distance from allocations to the contract curve """
+
+        return np.abs(x2A-np.interp(x1A,self.x1A,self.x2A))
+
+    def in_core(self,x1A,x2A,tol=1e-6):
+        """ check if allocations are on the contract curve and inside the lens """
+
+        on_curve = self.distance_to_contract_curve(x1A,x2A) <= tol
+        return on_curve & (x1A >= self.x1A_core_low) & (x1A <= self.x1A_core_high)
+
+    def best_on_grid(self,N1,N2):
+        """ best allocation for A among the pareto improvements on the (N1,N2) grid """
+
+        par = self.par
+
+        # a. reuse earlier grid
+        if (N1,N2) in self.grids:
+            return self.grids[(N1,N2)]
+
+        # b. pareto improvements on the grid
+        x1A = (np.arange(N1)/N1)[:,np.newaxis]
+        x2A = (np.arange(N2)/N2)[np.newaxis,:]
+        uA = self.utility_A(x1A,x2A)
+        uB = self.utility_B(1-x1A,1-x2A)
+        uA = np.where((uA > self.uA_endowment) & (uB > self.uB_endowment),uA,-np.inf)
+
+        # c. first best point in row-major order, the endowment if there are none
+        i,j = np.unravel_index(np.argmax(uA),uA.shape)
+        if uA[i,j] > self.uA_endowment:
+            best = (x1A[i,0],x2A[0,j],uA[i,j])
+        else:
+            best = (par.w1A,par.w2A,self.uA_endowment)
+
+        self.grids[(N1,N2)] = best
+        return best
+
 class ExchangeEconomyClass:
 
     def __init__(self):
         """ setup model """
 
         par = self.par = SimpleNamespace()
+        self.sol = SimpleNamespace()
 
         # a. preferences
         par.alpha = 1/3
@@ -17,6 +197,13 @@ class ExchangeEconomyClass:
         par.w1A = 0.8
         par.w2A = 0.3
 
+        # c. random endowments
+        par.seed = 2000
+        self.sampler = EndowmentSampler(seed=par.seed)
+
+        # d. Edgeworth boxes by parameters
+        self.boxes = OrderedDict()
+
     def utility_A(self,x1A,x2A):
         """ calculate utility of consumer A """
 
@@ -29,6 +216,33 @@ class ExchangeEconomyClass:
         par = self.par
         return x1B**par.beta*x2B**(1-par.beta)
 
+    def utility_A_grad(self,x1A,x2A):
+        """ calculate gradient of utility of consumer A """
+
+        par = self.par
+        return np.array([par.alpha*x1A**(par.alpha-1)*x2A**(1-par.alpha),
+                         (1-par.alpha)*x1A**par.alpha*x2A**(-par.alpha)])
+
+    def utility_B_grad(self,x1B,x2B):
+        """ calculate gradient of utility of consumer B """
+
+        par = self.par
+        return np.array([par.beta*x1B**(par.beta-1)*x2B**(1-par.beta),
+                         (1-par.beta)*x1B**par.beta*x2B**(-par.beta)])
+
+    def initial_guess(self,name,guess,warm_start):
+        """ start from the previous solution of solver name if warm starting """
+
+        if warm_start and hasattr(self.sol,name):
+            return getattr(self.sol,name).x
+        
+        return guess
+
+    def store_solution(self,name,res):
+        """ store solution and evaluation counts of solver name """
+
+        setattr(self.sol,name,SimpleNamespace(x=res.x,success=res.success,nit=res.nit,nfev=res.nfev,njev=res.njev))
+
     def demand_A(self,p1):
         """ calculate demand of consumer A """
 
@@ -59,48 +273,56 @@ class ExchangeEconomyClass:
         X2B = (1-par.beta)*IB
         return X1B,X2B
 
-    def find_pareto_improvements(self,N1,N2):
-        """ find pareto improvements compared to initial endowment """
+    def pareto_mask(self,N1,N2,chunk=None):
+        """ find pareto improvements on the (N1,N2) grid as a boolean mask """
 
         par = self.par
 
-        # a. Initialize tuples
-        shape_tuple = (N1,N2) #tuple of grid
-        x1A_values = np.empty(shape_tuple)
-        x2A_values = np.empty(shape_tuple)
-        uA_values = np.empty(shape_tuple)
-        uB_values = np.empty(shape_tuple)
+        # a. coordinates of the grid
+        x1A_values = np.arange(N1)/N1
+        x2A_values = np.arange(N2)/N2
 
-        # b. Initialize lists to store Pareto improvements
-        pareto_improvements = []
-
-        # c. start from guess of endowments
-        x1A_endowment = par.w1A
-        x2A_endowment = par.w2A
+        # b. utility at the endowment
         uA_endowment = self.utility_A(par.w1A,par.w2A)
         uB_endowment = self.utility_B((1-par.w1A),(1-par.w2A))
 
-        # d. loop through all possibilities
-        for i in range(N1):
-            for j in range(N2):
-                
-                # i. Define x1A, x1B and utilities for every loop
-                x1A_values[i,j] = x1A = (i/N1)
-                x2A_values[i,j] = x2A = (j/N2)
+        # c. evaluate the grid in blocks of rows to bound memory
+        if chunk is None:
+            chunk = N1
 
-                uA_values[i,j] = uA = self.utility_A(x1A,x2A)
-                uB_values[i,j] = uB = self.utility_B(1-x1A,1-x2A)
+        mask = np.empty((N1,N2),dtype=bool)
+        x2A = x2A_values[np.newaxis,:]
+        for start in range(0,N1,chunk):
+            
+            # i. rows in the block
+            x1A = x1A_values[start:start+chunk,np.newaxis]
+
+            # ii. utilities for every point in the block
+            uA = self.utility_A(x1A,x2A)
+            uB = self.utility_B(1-x1A,1-x2A)
+
+            # iii. check if both are better off
+            mask[start:start+chunk] = (uA > uA_endowment) & (uB > uB_endowment)
+
+        return mask,x1A_values,x2A_values
 
-                # ii. check if best sofar
-                if uA_values[i,j] > uA_endowment and uB_values[i,j] > uB_endowment:
-                    pareto_improvements.append((x1A, x2A))
+    def find_pareto_improvements(self,N1,N2,chunk=None):
+        """ find pareto improvements compared to initial endowment """
+
+        # a. vectorized grid search
+        mask,x1A_values,x2A_values = self.pareto_mask(N1,N2,chunk=chunk)
+
+        # b. list of (x1A,x2A) tuples in row-major order
+        i,j = np.nonzero(mask)
+        pareto_improvements = list(zip(x1A_values[i].tolist(),x2A_values[j].tolist()))
 
         return pareto_improvements
 
     def check_market_clearing(self,p1):
-        """ check market clearing conditions """
+        """ check market clearing conditions for a price or an array of prices """
 
         par = self.par
+        p1 = np.asarray(p1,dtype=float) if np.ndim(p1) > 0 else p1
 
         # a. define demand 
         x1A,x2A = self.demand_A(p1)
@@ -113,8 +335,9 @@ class ExchangeEconomyClass:
         return eps1,eps2
     
     def excess(self,p1):
-        """ calculate excess demand for good 1 """
+        """ calculate excess demand for good 1 for a price or an array of prices """
         par = self.par
+        p1 = np.asarray(p1,dtype=float) if np.ndim(p1) > 0 else p1
         
         # a. define demand 
         x1A,x2A = self.demand_A(p1)
@@ -124,6 +347,43 @@ class ExchangeEconomyClass:
         eps1 = x1A-par.w1A + x1B-(1-par.w1A)
 
         return eps1
+
+    def find_bracket(self,p1_values):
+        """ find the first interval on a price grid where excess demand changes sign """
+
+        # a. excess demand on the whole grid at once
+        excess = self.excess(p1_values)
+
+        # b. first sign change
+        sign_change = np.nonzero(np.sign(excess[:-1]) != np.sign(excess[1:]))[0]
+        if sign_change.size == 0:
+            return None
+
+        i = sign_change[0]
+        return p1_values[i],p1_values[i+1]
+
+    def expand_bracket(self,p1=1.0,factor=2.0,maxiter=100):
+        """ expand an interval around p1 geometrically until excess demand changes sign """
+
+        # a. start from a narrow interval
+        p_low = p1/factor
+        p_high = p1*factor
+        excess_low = self.excess(p_low)
+        excess_high = self.excess(p_high)
+
+        # b. move the end with the same sign as the other end outwards
+        for _ in range(maxiter):
+            if np.sign(excess_low) != np.sign(excess_high):
+                return p_low,p_high
+            
+            if abs(excess_low) < abs(excess_high):
+                p_low /= factor
+                excess_low = self.excess(p_low)
+            else:
+                p_high *= factor
+                excess_high = self.excess(p_high)
+
+        raise ValueError(f'no sign change in excess demand in [{p_low}, {p_high}]')
     
     def find_equilibrium(self, do_grid_search = True,do_print = True):
         """ find market clearing price """
@@ -131,22 +391,22 @@ class ExchangeEconomyClass:
         par = self.par
 
         # a. define prices
-        p1_values = list(0.5 + 2 * (i / 75) for i in range(76))
-        p1_values_array = np.array(p1_values)
+        p1_values = 0.5 + 2*np.arange(76)/75
 
-        # b. find price interval where the market error is close to zero
+        # b. find price interval where the market error changes sign
+        bracket = None
         if do_grid_search:
-            found_bracket = False
-            for i,p in enumerate(p1_values_array):
-                excess = self.excess(p)
-                if do_print:
+            if do_print:
+                for p,excess in zip(p1_values,self.excess(p1_values)):
                     print(f'p= {p:.2f}, excess = {excess:.2f}')
 
-                # save the bracket that contains 0
-                if excess < 0 and not found_bracket:
-                    p_low = p1_values_array[i-1]
-                    p_high = p1_values_array[i]
-                    found_bracket = True
+            bracket = self.find_bracket(p1_values)
+        
+        # otherwise, or if the grid does not contain a sign change, search adaptively
+        if bracket is None:
+            bracket = self.expand_bracket()
+
+        p_low,p_high = bracket
         
         # c. find the equilibrium price
         p1_eq = optimize.brentq(self.excess, p_low, p_high)
@@ -164,30 +424,70 @@ class ExchangeEconomyClass:
         return p1_eq
         
 
-    def Utility_max_a(self,do_print=True):
+    def price_setter_batch(self,w1A=None,w2A=None,alpha=None,beta=None,N=76,p1_min=0.5,p1_max=2.5,refine=True,tol=1e-10,maxiter=200):
+        """ find the price maximizing utility of consumer A for arrays of parameters """
+
+        with self.batch_par(w1A=w1A,w2A=w2A,alpha=alpha,beta=beta) as par:
+
+            # a. add an axis for prices
+            for key in ['w1A','w2A','alpha','beta']:
+                setattr(par,key,getattr(par,key)[...,np.newaxis])
+
+            def obj(p1):
+                """ utility of A given B's demand, -inf where the allocation is infeasible """
+                x1B,x2B = self.demand_B(p1)
+                with np.errstate(invalid='ignore'):
+                    uA = self.utility_A(1-x1B,1-x2B)
+                return np.where(np.isnan(uA),-np.inf,uA)
+
+            # b. utility on the whole price grid at once
+            p1_values = np.linspace(p1_min,p1_max,N)
+            uA_values = obj(p1_values)
+
+            i = np.argmax(uA_values,axis=-1)[...,np.newaxis]
+            p1 = np.take(p1_values,i)
+            uA = np.take_along_axis(uA_values,i,axis=-1)
+
+            # c. refine between the neighbouring grid points with golden-section search
+            if refine:
+                g = (np.sqrt(5)-1)/2
+                a = np.take(p1_values,np.maximum(i-1,0))
+                b = np.take(p1_values,np.minimum(i+1,N-1))
+                c = b-g*(b-a)
+                d = a+g*(b-a)
+                fc,fd = obj(c),obj(d)
+
+                for _ in range(maxiter):
+                    
+                    if np.all(b-a < tol):
+                        break
+
+                    # i. keep the part of the interval with the best point
+                    left = fc > fd
+                    a,b = np.where(left,a,c),np.where(left,d,b)
+
+                    # ii. one new point per iteration
+                    new = np.where(left,b-g*(b-a),a+g*(b-a))
+                    fnew = obj(new)
+                    c,fc,d,fd = np.where(left,new,d),np.where(left,fnew,fd),np.where(left,c,new),np.where(left,fc,fnew)
+
+                # iii. only accept improvements on the grid
+                p1_refined = (a+b)/2
+                uA_refined = obj(p1_refined)
+                better = uA_refined > uA
+                p1 = np.where(better,p1_refined,p1)
+                uA = np.where(better,uA_refined,uA)
+
+            # d. allocation of A
+            x1B,x2B = self.demand_B(p1)
+
+        return p1[...,0],1-x1B[...,0],1-x2B[...,0],uA[...,0]
+
+    def Utility_max_a(self,do_print=True,N=76,refine=True,tol=1e-10):
         """ maximize utility of consumer A for prices P"""
 
-        # a. Define initial conditions for best utility and corresponding price
-        utility_best = -np.inf
-        best_p1 = np.nan
-        p1_values = list(0.5 + 2 * (i / 75) for i in range(76))
-        p1_values_array = np.array(p1_values)
-
-        # b. Iterate over each value of p1
-        for p1 in p1_values_array:
-            # i. calculate A's demand and B's demand for goods 1 and 2 at price p1
-            x1A, x2A = self.demand_A(p1)  # Use agent A's demand
-            x1B, x2B = self.demand_B(p1)  # Use agent B's demand
-
-            # ii. Calculate the utility for agent A using the given formula
-            utility = self.utility_A(1-x1B, 1-x2B)
-
-            # iii. Update the best utility and corresponding p1 if the current utility is higher
-            if utility > utility_best:
-                utility_best = utility
-                best_p1 = p1
-                best_X1A = 1-x1B
-                best_X2A = 1-x2B
+        # a. vectorized grid search and refinement
+        best_p1,best_X1A,best_X2A,utility_best = self.price_setter_batch(N=N,refine=refine,tol=tol)
         
         if do_print: 
             print(f'At p1 = {best_p1:.4f} consumer A´s utility is maximized and equal to {utility_best:.4f}')
@@ -196,23 +496,53 @@ class ExchangeEconomyClass:
 
         return best_X1A, best_X2A 
             
-    def Utility_max_b(self,do_print=True):
+    def Utility_max_b(self,do_print=True,warm_start=False):
         """ maximize utility of consumer A for any positive price """
 
         par = self.par
 
-        # a. objective function (to minimize) 
-        obj = lambda x: -self.utility_A(1-self.demand_B(x[0])[0], 1-self.demand_B(x[0])[1])  # utility function
+        # a. objective function (to minimize) and its gradient
+        def obj(x):
+            
+            # i. allocation of A given B's demand
+            p1 = x[0]
+            x1B,x2B = self.demand_B(p1)
+            uA = self.utility_A(1-x1B,1-x2B)
+
+            # ii. chain rule through B's demand
+            dx1B = -par.beta*(1-par.w2A)/p1**2
+            dx2B = (1-par.beta)*(1-par.w1A)
+            duA = self.utility_A_grad(1-x1B,1-x2B)@np.array([-dx1B,-dx2B])
+
+            return -uA,np.array([-duA])
+
+        # b. bounds on the price such that A's allocation is non-negative
+        eps = 1e-6 # the gradient is infinite at the bounds
+        
+        # i. lower bound, x1A < 0 at every price when beta = 1 and w1A = 0
+        den_min = 1-par.beta*(1-par.w1A)
+        p1_min = par.beta*(1-par.w2A)/den_min if den_min > 0 else 0.0
+        p1_min = max(p1_min*(1+eps),eps)
+
+        # ii. upper bound, none when B's demand for good 2 does not depend on the price
+        if par.beta < 1 and par.w1A < 1:
+            p1_max = (1/(1-par.beta)-(1-par.w2A))/(1-par.w1A)*(1-eps)
+        else:
+            p1_max = None
 
-        # b. call solver, use SLSQP
-        initial_guess = 1 
+        bounds = ((p1_min,p1_max),)
 
-        res = optimize.minimize(obj, initial_guess, method='SLSQP')
+        # c. call solver, use SLSQP, a warm start may lie outside the bounds of new parameters
+        initial_guess = np.clip(self.initial_guess('Utility_max_b',[1.0],warm_start),*bounds[0])
+
+        res = optimize.minimize(obj, initial_guess, jac=True, bounds=bounds, method='SLSQP')
+        self.store_solution('Utility_max_b',res)
     
-        # c. unpack and print solution
+        # d. unpack and print solution
         p1 = res.x[0]
-        X1A = 1 - self.demand_B(p1)[0]
-        X2A = 1 - self.demand_B(p1)[1]
+        x1B,x2B = self.demand_B(p1)
+        X1A = 1 - x1B
+        X2A = 1 - x2B
         uA = self.utility_A(X1A, X2A)
 
         if do_print: 
@@ -222,27 +552,29 @@ class ExchangeEconomyClass:
         
         return X1A, X2A
 
-    def pareto_optimizer(self,do_print=True):
-        """ maximize utility of consumer A in pareto improvements"""
+    def edgeworth_box(self,N=10_000,maxsize=16):
+        """ Edgeworth box for the current parameters, cached across calls """
 
         par = self.par
+        key = (par.alpha,par.beta,par.w1A,par.w2A,N)
 
-        # a. start from guess which is the initial endowment
-        X1A_best = par.w1A
-        X2A_best = par.w2A
-        uA_best = self.utility_A(par.w1A,par.w2A)
+        # a. reuse earlier box
+        if key in self.boxes:
+            self.boxes.move_to_end(key)
+            return self.boxes[key]
 
-        # b. loop through all the pareto improvements
-        for X1A,X2A in self.find_pareto_improvements(N1=76,N2=76):
-            
-            # i. Utility
-            uA = self.utility_A(X1A,X2A)
+        # b. build and evict the least recently used box
+        box = self.boxes[key] = EdgeworthBox(self,N)
+        if len(self.boxes) > maxsize:
+            self.boxes.popitem(last=False)
+
+        return box
+
+    def pareto_optimizer(self,do_print=True):
+        """ maximize utility of consumer A in pareto improvements"""
 
-            # iii. check if best sofar
-            if uA > uA_best:
-                X1A_best = X1A
-                X2A_best = X2A 
-                uA_best = uA
+        # a. best of the pareto improvements on the grid
+        X1A_best,X2A_best,uA_best = self.edgeworth_box().best_on_grid(N1=76,N2=76)
 
         if do_print: 
             print(f'The allocation is x1A = {X1A_best:.4f} and x2A = {X2A_best:.4f} with utility of consumer A equal to {uA_best:.4f}')
@@ -250,22 +582,27 @@ class ExchangeEconomyClass:
 
         return X1A_best, X2A_best
 
-    def marketmaker_solver(self,do_print=True):
+    def marketmaker_solver(self,do_print=True,warm_start=False):
         """ maximize utility of consumer A where A is market maker"""
 
         par = self.par
 
-        # a. objective function (to minimize) 
-        obj = lambda x: -self.utility_A(x[0], x[1])  # utility function
+        # a. objective function (to minimize) and its gradient
+        obj = lambda x: (-self.utility_A(x[0], x[1]), -self.utility_A_grad(x[0], x[1]))
 
         # b. constraints and bounds
-        const = ({'type': 'ineq', 'fun': lambda x: self.utility_B(1-x[0],1-x[1]) - self.utility_B((1-par.w1A),(1-par.w2A))})
-        bounds = ((0,1),(0,1))
+        uB_endowment = self.utility_B((1-par.w1A),(1-par.w2A))
+        const = ({'type': 'ineq', 
+                  'fun': lambda x: self.utility_B(1-x[0],1-x[1]) - uB_endowment,
+                  'jac': lambda x: -self.utility_B_grad(1-x[0],1-x[1])})
+        eps = 1e-6 # the gradients are infinite at the edges of the box
+        bounds = ((eps,1-eps),(eps,1-eps))
 
         # c. call solver, use SLSQP
-        initial_guess = np.array([par.w1A , par.w2A])  # Initial guess
+        initial_guess = self.initial_guess('marketmaker_solver',np.array([par.w1A , par.w2A]),warm_start)
 
-        res = optimize.minimize(obj, initial_guess, bounds=bounds, constraints=const, method='SLSQP')
+        res = optimize.minimize(obj, initial_guess, jac=True, bounds=bounds, constraints=const, method='SLSQP')
+        self.store_solution('marketmaker_solver',res)
     
         # d. unpack and print solution
         x1A = res.x[0]
@@ -279,21 +616,24 @@ class ExchangeEconomyClass:
         return x1A, x2A 
 
    
-    def socialplanner_solver(self,do_print=True):
+    def socialplanner_solver(self,do_print=True,warm_start=False):
         """ maximize aggregate utility """
 
         par = self.par
 
-        # a. objective function (to minimize) 
-        obj = lambda x: -self.utility_A(x[0], x[1])-self.utility_B(1-x[0], 1-x[1])  # utility function
+        # a. objective function (to minimize) and its gradient
+        obj = lambda x: (-self.utility_A(x[0], x[1])-self.utility_B(1-x[0], 1-x[1]),
+                         -self.utility_A_grad(x[0], x[1])+self.utility_B_grad(1-x[0], 1-x[1]))
 
         # b. Bounds
-        bounds = ((0,1),(0,1))
+        eps = 1e-6 # the gradients are infinite at the edges of the box
+        bounds = ((eps,1-eps),(eps,1-eps))
 
         # c. call solver, use SLSQP
-        initial_guess = np.array([par.w1A , par.w2A])  # Initial guess
+        initial_guess = self.initial_guess('socialplanner_solver',np.array([par.w1A , par.w2A]),warm_start)
 
-        res = optimize.minimize(obj, initial_guess, bounds=bounds, method='SLSQP')
+        res = optimize.minimize(obj, initial_guess, jac=True, bounds=bounds, method='SLSQP')
+        self.store_solution('socialplanner_solver',res)
     
         # d. unpack and print solution
         x1A = res.x[0]
@@ -313,37 +653,125 @@ class ExchangeEconomyClass:
     def setw(self, s):
         """ create random set of endowments """
 
-        # a. set seed
-        np.random.seed(2000)
-
-        # b. draw uniformly distributed endowments
-        w1A = np.random.uniform(size=s)
-        w2A = np.random.uniform(size=s)
+        # a. draw uniformly distributed endowments
+        W = self.sampler.draw(s,seed=self.par.seed)
 
-        # c. create a random set of endowments
-        W = []
-        for i in range(s):
-            W.append((w1A[i], w2A[i]))
-        
-        return W
+        # b. create a random set of endowments
+        return [tuple(w) for w in W.tolist()]
     
-    def equilibriumallocation(self):
-        """ find the market equilibrium allocation """
+    @contextmanager
+    def batch_par(self,w1A=None,w2A=None,alpha=None,beta=None):
+        """ temporarily replace parameters with broadcasted arrays """
 
         par = self.par
 
-        allocation=[]
+        # a. fill in missing parameters from the model
+        values = dict(w1A=w1A,w2A=w2A,alpha=alpha,beta=beta)
+        values = {key:getattr(par,key) if value is None else value for key,value in values.items()}
 
-        for i in range(50):
-            w1A, w2A = self.setw(s=50)[i]
-            par.w1A=w1A
-            par.w2A=w2A
+        # b. broadcast to a common shape
+        arrays = np.broadcast_arrays(*[np.asarray(value,dtype=float) for value in values.values()])
+        
+        # c. swap in the batch and restore afterwards
+        self.par = SimpleNamespace(**{**vars(par),**dict(zip(values.keys(),arrays))})
+        try:
+            yield self.par
+        finally:
+            self.par = par
+
+    def solve_equilibrium_batch(self,w1A,w2A,alpha=None,beta=None,method=None,p_low=1e-6,p_high=1e6,tol=1e-12,maxiter=200):
+        """ find market clearing prices and allocations for arrays of parameters """
+
+        # a. the closed form only holds for the Cobb-Douglas demands of this class
+        if method is None:
+            cobb_douglas = type(self).demand_A is ExchangeEconomyClass.demand_A and type(self).demand_B is ExchangeEconomyClass.demand_B
+            method = 'closed_form' if cobb_douglas else 'bisection'
+
+        with self.batch_par(w1A=w1A,w2A=w2A,alpha=alpha,beta=beta) as par:
 
-            p1_eq = self.find_equilibrium(do_print=False)
-            x1A, x2A = self.demand_A(p1_eq)
+            # b. market clearing price
+            if method == 'closed_form':
+                
+                # i. Cobb-Douglas: excess demand for good 1 is linear in 1/p1
+                num = par.alpha*par.w2A + par.beta*(1-par.w2A)
+                den = 1 - par.alpha*par.w1A - par.beta*(1-par.w1A)
+                p1 = num/den
 
-            allocation.append((x1A, x2A))
+            elif method == 'bisection':
+                
+                # i. bracket
+                low = np.full(par.w1A.shape,p_low)
+                high = np.full(par.w1A.shape,p_high)
+                excess_low = self.excess(low)
+                no_sign_change = np.sign(excess_low) == np.sign(self.excess(high))
+                if np.any(no_sign_change):
+                    raise ValueError(f'no sign change in excess demand between p_low={p_low} and p_high={p_high} for {np.count_nonzero(no_sign_change)} economies')
+
+                # ii. bisect in logs until all brackets are tight
+                for _ in range(maxiter):
+                    mid = np.sqrt(low*high)
+                    excess_mid = self.excess(mid)
+                    same_sign = np.sign(excess_mid) == np.sign(excess_low)
+                    low = np.where(same_sign,mid,low)
+                    excess_low = np.where(same_sign,excess_mid,excess_low)
+                    high = np.where(same_sign,high,mid)
+                    if np.all(high-low < tol*high):
+                        break
+
+                p1 = np.sqrt(low*high)
+
+            else:
+                raise ValueError(f'unknown method: {method}')
+
+            # c. allocation of consumer A
+            x1A,x2A = self.demand_A(p1)
+
+        return p1,x1A,x2A
+
+    def equilibriumallocation(self):
+        """ find the market equilibrium allocation """
+
+        # a. draw endowments
+        W = self.sampler.draw(50,seed=self.par.seed)
+
+        # b. solve all economies at once
+        p1_eq,x1A,x2A = self.solve_equilibrium_batch(W[:,0],W[:,1])
+
+        allocation = list(zip(x1A.tolist(),x2A.tolist()))
 
         return allocation
 
+    def sweep(self,alpha=None,beta=None,w1A=None,w2A=None,methods=SWEEP_METHODS,workers=1,chunksize=16,warm_start=True,as_frame=False):
+        """ run solvers on every point of a grid over (alpha,beta,w1A,w2A), in blocks of chunksize points """
 
+        par = self.par
+
+        # a. grid, missing dimensions are fixed at the model parameters
+        grid = dict(alpha=alpha,beta=beta,w1A=w1A,w2A=w2A)
+        grid = {key:np.atleast_1d(getattr(par,key) if value is None else value).astype(float) for key,value in grid.items()}
+        
+        mesh = np.meshgrid(*grid.values(),indexing='ij')
+        columns = {key:values.ravel() for key,values in zip(grid.keys(),mesh)}
+
+        # b. one task per block of neighbouring points, the blocks do not depend on the number of workers
+        n = columns['alpha'].size
+        points = [{key:float(values[i]) for key,values in columns.items()} for i in range(n)]
+        tasks = [(points[i:i+chunksize],tuple(methods),warm_start) for i in range(0,n,chunksize)]
+
+        # c. solve, the results come back in task order for any number of workers
+        if workers == 1:
+            blocks = list(map(sweep_task,tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                blocks = list(executor.map(sweep_task,tasks))
+        results = [result for block in blocks for result in block]
+
+        # d. collect in columns
+        for key in results[0].keys():
+            columns[key] = np.array([result[key] for result in results],dtype=float)
+
+        if as_frame:
+            import pandas as pd
+            return pd.DataFrame(columns)
+
+        return columns
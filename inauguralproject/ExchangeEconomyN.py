@@ -0,0 +1,138 @@
+import warnings
+import numpy as np
+from types import SimpleNamespace
+
+class ExchangeEconomyNClass:
+
+    def __init__(self,M=2,N=2,seed=2000):
+        """ setup model with M agents and N goods """
+
+        par = self.par = SimpleNamespace()
+        self.sol = SimpleNamespace()
+
+        rng = np.random.default_rng(seed)
+
+        # a. preferences: Cobb-Douglas budget shares, each row sums to one
+        alpha = rng.uniform(0.1,1.0,size=(M,N))
+        par.alpha = alpha/alpha.sum(axis=1,keepdims=True)
+
+        # b. endowments: each good sums to one across agents
+        W = rng.uniform(0.1,1.0,size=(M,N))
+        par.W = W/W.sum(axis=0,keepdims=True)
+
+    @classmethod
+    def from_two_good(cls,model):
+        """ create the N-good economy equivalent to an ExchangeEconomyClass """
+
+        par = model.par
+
+        economy = cls(M=2,N=2)
+        economy.par.alpha = np.array([[par.alpha,1-par.alpha],[par.beta,1-par.beta]])
+        economy.par.W = np.array([[par.w1A,par.w2A],[1-par.w1A,1-par.w2A]])
+
+        return economy
+
+    def income(self,p):
+        """ calculate income of every agent """
+
+        return self.par.W@p
+
+    def demand(self,p):
+        """ calculate demand of every agent for every good """
+
+        par = self.par
+
+        # a. Income
+        I = self.income(p)
+
+        # b. Demand, shape (M,N)
+        return par.alpha*I[:,np.newaxis]/p[np.newaxis,:]
+
+    def excess(self,p):
+        """ calculate aggregate excess demand for every good """
+
+        par = self.par
+
+        # a. spending on every good
+        spending = par.alpha.T@self.income(p)
+
+        # b. demand minus total endowment
+        return spending/p - par.W.sum(axis=0)
+
+    def jacobian(self,p):
+        """ calculate the Jacobian of aggregate excess demand wrt. prices """
+
+        par = self.par
+
+        # a. spending on every good
+        spending = par.alpha.T@self.income(p)
+
+        # b. derivative through income and through the own price
+        J = (par.alpha.T@par.W)/p[:,np.newaxis]
+        J[np.diag_indices_from(J)] -= spending/p**2
+
+        return J
+
+    def find_equilibrium(self,method='newton',p0=None,tol=1e-10,maxiter=500,step=0.5,do_print=False):
+        """ find market clearing prices with the last good as numeraire """
+
+        par = self.par
+        N = par.alpha.shape[1]
+
+        # a. initial guess
+        p = np.ones(N) if p0 is None else np.asarray(p0,dtype=float)
+        p = p/p[-1]
+        z = self.excess(p)
+
+        # b. iterate on the N-1 first markets, the last clears by Walras' law
+        it = 0
+        while it < maxiter:
+
+            if np.max(np.abs(z[:-1])) < tol:
+                break
+
+            if method == 'newton':
+
+                # i. Newton step in log prices
+                J = self.jacobian(p)[:-1,:-1]*p[np.newaxis,:-1]
+                dlogp = np.linalg.solve(J,-z[:-1])
+
+                # ii. backtrack until the error falls
+                t = 1.0
+                while True:
+                    p_new = p.copy()
+                    p_new[:-1] = p[:-1]*np.exp(t*dlogp)
+                    z_new = self.excess(p_new)
+                    if np.max(np.abs(z_new[:-1])) < np.max(np.abs(z[:-1])) or t < 1e-8:
+                        break
+                    t /= 2
+
+                p,z = p_new,z_new
+
+            elif method == 'tatonnement':
+
+                # i. raise prices of goods in excess demand
+                p = p.copy()
+                p[:-1] = p[:-1]*np.exp(step*z[:-1]/par.W.sum(axis=0)[:-1])
+                z = self.excess(p)
+
+            else:
+                raise ValueError(f'unknown method: {method}')
+
+            it += 1
+
+        # c. convergence
+        sol = self.sol
+        sol.p = p
+        sol.it = it
+        sol.error = np.max(np.abs(z))
+        sol.converged = np.max(np.abs(z[:-1])) < tol
+
+        if not sol.converged:
+            warnings.warn(f'{method} did not converge in {maxiter} iterations, max market error = {sol.error:.2e}',RuntimeWarning)
+
+        if do_print:
+            status = 'converged' if sol.converged else 'did not converge'
+            print(f'{method} {status} in {it} iterations, max market error = {sol.error:.2e}')
+
+        return p
@@ -0,0 +1,171 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tracemalloc
+import numpy as np
+
+from ExchangeEconomy import ExchangeEconomyClass
+from ExchangeEconomyN import ExchangeEconomyNClass
+
+# methods counted as objective evaluations
+COUNTED = ('utility_A','utility_B','demand_A','demand_B','excess')
+
+def scaling_benchmark(M_values=(10,100,1000),N_values=(2,10,50),methods=('newton',),repeats=3,do_print=True):
+    """ time the N-good equilibrium solver as agents and goods grow """
+
+    results = []
+
+    for M in M_values:
+        for N in N_values:
+
+            # a. draw economy
+            economy = ExchangeEconomyNClass(M=M,N=N)
+
+            for method in methods:
+
+                # b. best of repeats
+                times = []
+                for _ in range(repeats):
+                    t0 = time.perf_counter()
+                    p = economy.find_equilibrium(method=method)
+                    times.append(time.perf_counter()-t0)
+
+                error = np.max(np.abs(economy.excess(p)))
+                converged = bool(economy.sol.converged)
+                results.append(dict(M=M,N=N,method=method,seconds=min(times),error=error,converged=converged))
+
+                if do_print:
+                    print(f'M = {M:5d}, N = {N:3d}, {method:12s}: {min(times)*1000:8.2f} ms, max market error = {error:.1e}{"" if converged else " (not converged)"}')
+
+    return results
+
+def count_calls(model):
+    """ wrap the methods of model in COUNTED with call counters """
+
+    counts = dict.fromkeys(COUNTED,0)
+
+    def wrap(name):
+        method = getattr(model,name)
+        def counted(*args,**kwargs):
+            counts[name] += 1
+            return method(*args,**kwargs)
+        return counted
+
+    for name in COUNTED:
+        setattr(model,name,wrap(name))
+
+    return counts
+
+def cases(quick=False):
+    """ benchmark cases as (name, size, function of a fresh model) """
+
+    W = ExchangeEconomyClass().sampler.draw(10**6)
+
+    sizes = dict(
+        grid=(76,500) if quick else (76,500,2000),
+        price_grid=(76,1000) if quick else (76,1000,10_000),
+        batch=(100,10_000) if quick else (100,10_000,1_000_000),
+    )
+
+    yield from [('find_pareto_improvements',N,lambda model,N=N: model.find_pareto_improvements(N,N)) for N in sizes['grid']]
+    yield from [('pareto_mask',N,lambda model,N=N: model.pareto_mask(N,N,chunk=256)) for N in sizes['grid']]
+    yield ('find_equilibrium',1,lambda model: model.find_equilibrium(do_print=False))
+    yield from [('solve_equilibrium_batch',n,lambda model,n=n: model.solve_equilibrium_batch(W[:n,0],W[:n,1])) for n in sizes['batch']]
+    yield from [('Utility_max_a',N,lambda model,N=N: model.Utility_max_a(do_print=False,N=N)) for N in sizes['price_grid']]
+    yield from [('price_setter_batch',n,lambda model,n=n: model.price_setter_batch(W[:n,0],W[:n,1])) for n in sizes['batch'][:2]]
+    yield ('Utility_max_b',1,lambda model: model.Utility_max_b(do_print=False))
+    yield ('pareto_optimizer',76,lambda model: model.pareto_optimizer(do_print=False))
+    yield ('marketmaker_solver',1,lambda model: model.marketmaker_solver(do_print=False))
+    yield ('socialplanner_solver',1,lambda model: model.socialplanner_solver(do_print=False))
+    yield ('equilibriumallocation',50,lambda model: model.equilibriumallocation())
+
+def run_benchmarks(quick=False,repeats=3,do_print=True):
+    """ measure wall time, peak memory and evaluation counts of every case """
+
+    results = []
+
+    for name,size,func in cases(quick=quick):
+
+        # a. wall time, best of repeats on fresh models
+        times = []
+        for _ in range(repeats):
+            model = ExchangeEconomyClass()
+            t0 = time.perf_counter()
+            func(model)
+            times.append(time.perf_counter()-t0)
+
+        # b. peak memory and evaluation counts in a separate run
+        model = ExchangeEconomyClass()
+        counts = count_calls(model)
+        tracemalloc.start()
+        func(model)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = dict(name=name,size=size,seconds=min(times),peak_mb=peak/1e6,evaluations=sum(counts.values()),counts=counts)
+        results.append(result)
+
+        if do_print:
+            print(f'{name:25s} {size:9d}: {min(times)*1000:10.2f} ms {peak/1e6:10.2f} MB {sum(counts.values()):8d} evaluations')
+
+    return results
+
+def metadata():
+    """ describe the commit and machine the results come from """
+
+    try:
+        commit = subprocess.run(['git','rev-parse','HEAD'],capture_output=True,text=True,check=True).stdout.strip()
+    except (OSError,subprocess.CalledProcessError):
+        commit = None
+
+    return dict(commit=commit,python=platform.python_version(),numpy=np.__version__,machine=platform.platform(),time=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+def write_results(results,path):
+    """ write results and metadata as JSON """
+
+    with open(path,'w') as f:
+        json.dump(dict(metadata=metadata(),results=results),f,indent=2)
+
+def compare(results,baseline_path,threshold=1.25,min_seconds=1e-3,do_print=True):
+    """ find cases that are more than threshold times slower than in the baseline """
+
+    with open(baseline_path) as f:
+        baseline = {(r['name'],r['size']):r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        old = baseline.get((result['name'],result['size']))
+        # cases faster than min_seconds are too noisy to compare
+        if old is None or max(old['seconds'],result['seconds']) < min_seconds:
+            continue
+
+        ratio = result['seconds']/old['seconds']
+        if ratio > threshold:
+            regressions.append(dict(name=result['name'],size=result['size'],ratio=ratio))
+            if do_print:
+                print(f'regression: {result["name"]} (size {result["size"]}) is {ratio:.2f} times slower')
+
+    return regressions
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the ExchangeEconomy solvers')
+    parser.add_argument('--out',default='benchmark.json',help='file to write results to')
+    parser.add_argument('--compare',default=None,help='earlier results to compare against')
+    parser.add_argument('--threshold',type=float,default=1.25,help='slowdown ratio counted as a regression')
+    parser.add_argument('--repeats',type=int,default=3)
+    parser.add_argument('--quick',action='store_true',help='only run the small sizes')
+    parser.add_argument('--scaling',action='store_true',help='also run the N-good scaling benchmark')
+    args = parser.parse_args()
+
+    results = run_benchmarks(quick=args.quick,repeats=args.repeats)
+    write_results(results,args.out)
+
+    if args.scaling:
+        scaling_benchmark(methods=('newton','tatonnement'))
+
+    if args.compare is not None and compare(results,args.compare,threshold=args.threshold):
+        sys.exit(1)
@@ -0,0 +1,131 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from IPython.display import display
+from ipywidgets import Layout
+import ipywidgets as widgets
+
+def plotvaryingalpha(alpha_vec, w_values):
+    """ plot the wage as a function of alpha """
+
+    # Create a new figure
+    fig = plt.figure()
+    ax = fig.add_subplot(1,1,1)
+
+    ax.plot(alpha_vec, w_values)
+    ax.set_xlabel('Alpha')
+    ax.set_ylabel('Wage')
+    ax.set_title('Wage as a function of alpha')
+
+    specific_alpha = 1/3
+    specific_wage = 26.7
+    ax.scatter(specific_alpha, specific_wage, color='red', s=100, zorder=5, label='Numerical solution')
+
+    ax.grid(True)
+    plt.legend()
+    plt.show()
+
+def plotwages(w_values, min, max, title):
+    """ plot the distribution of simulated wages """
+
+    plt.hist(w_values, bins=100, range=(min, max))
+    plt.xlabel('Wage')
+    plt.ylabel('Frequency')
+    plt.title(title)
+    plt.grid(alpha=0.3)
+    plt.show()
+
+def plotcounts(counts, edges, title):
+    """ plot a wage distribution from histogram counts """
+
+    plt.hist(edges[:-1], bins=edges, weights=counts)
+    plt.xlabel('Wage')
+    plt.ylabel('Frequency')
+    plt.title(title)
+    plt.grid(alpha=0.3)
+    plt.show()
+
+def renderhistogram(counts, edges):
+    """ render a wage histogram to PNG bytes """
+
+    # a figure outside pyplot can be drawn on any thread
+    fig = Figure(figsize=(6.4, 4.8))
+    ax = fig.add_subplot(1, 1, 1)
+    ax.stairs(counts, edges, fill=True)
+    ax.set_xlabel('Wage')
+    ax.set_ylabel('Frequency')
+    ax.set_title('Distribution of Wages')
+    ax.grid(alpha=0.3)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+def interactive_plot(model):
+    """ Interactive plot for exploring Nash Bargaining Model """
+
+    val = model.val
+
+    # background threads: one precomputes the slider ticks, one serves updates
+    executor = ThreadPoolExecutor(max_workers=2)
+    state = SimpleNamespace(generation=0, future=None)
+
+    def show(alpha, d1, generation):
+        counts, edges = model.wagehistogram(alpha, d1)
+        png = renderhistogram(counts, edges)
+        wage = model.wagefunction()(val.theta, d1, val.d2, alpha)
+
+        # drop results of requests that are no longer current
+        if generation == state.generation:
+            image.value = png
+            label.value = f'Wage at theta = {val.theta}: {wage:.1f}'
+
+    def update(change):
+        val.alpha = alpha_slider.value
+        val.d1 = d1_slider.value
+
+        # cancel the stale request if it has not started
+        state.generation += 1
+        if state.future is not None:
+            state.future.cancel()
+        state.future = executor.submit(show, alpha_slider.value, d1_slider.value, state.generation)
+
+    def precompute():
+        for d1 in range(d1_slider.min, d1_slider.max+1, d1_slider.step):
+            for alpha in np.round(np.arange(0, 101)*alpha_slider.step, 2):
+                model.wagehistogram(alpha, d1)
+
+    # Customize slider width and description width
+    slider_layout = Layout(width='600px', margin='0px 0px 0px 20px')  # Adjust the left margin as needed
+    description_width = 'initial'  # This setting helps to avoid cutting off the descriptions
+
+    alpha_slider = widgets.FloatSlider(
+    value=1/3, min=0, max=1, step=0.01,
+    description='Alpha: Bargaining power of the worker',
+    style={'description_width': description_width},
+      layout=slider_layout
+    )
+
+    d1_slider = widgets.IntSlider(
+    value=10, min=0, max=20, step=1,
+    description='d1: Threat Point',
+    style={'description_width': description_width},
+    layout=slider_layout
+    )
+
+    # Update on every slider change
+    alpha_slider.observe(update, names='value')
+    d1_slider.observe(update, names='value')
+
+    # Output
+    image = widgets.Image(format='png')
+    label = widgets.Label()
+
+    # Display widgets
+    display(widgets.VBox([alpha_slider, d1_slider, label, image]))
+
+    update(None)
+    executor.submit(precompute)
@@ -1,27 +1,152 @@
-from scipy import optimize
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 from types import SimpleNamespace
-import sympy as sm
 import numpy as np
-import matplotlib.pyplot as plt
-from IPython.display import display, clear_output
-from ipywidgets import interact, FloatSlider, IntSlider, Button, Layout
-import ipywidgets as widgets
+
+# sympy and scipy are imported on first use, plots and widgets live in modelplots.py and are imported when needed
+
+# solved first-order conditions are stored here across sessions
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),'__solutioncache__')
+
+# Nash product with threat points, as text so it can be hashed without importing sympy
+NASH_OBJECTIVE = '((w-d1)**alpha)*(theta-w-d2)**(1-alpha)'
+
+solutions = {}
+sources = {}
+compiled = {}
+
+def solvefoc(objective,x,cache_dir=CACHE_DIR):
+    """ solve the first-order condition of objective wrt. x, memoized in memory and on disk """
+
+    import sympy as sm
+
+    # a. key on the expression
+    key = hashlib.sha256(sm.srepr((objective,x)).encode()).hexdigest()
+
+    if key in solutions:
+        return solutions[key]
+
+    # b. load from disk
+    path = None if cache_dir is None else os.path.join(cache_dir,f'{key}.txt')
+    if path is not None and os.path.exists(path):
+        with open(path) as f:
+            sol = sm.sympify(f.read())
+
+    # c. solve and store on disk
+    else:
+        foc = sm.diff(objective,x)
+        sol = sm.solve(foc,x)[0]
+
+        if path is not None:
+            os.makedirs(cache_dir,exist_ok=True)
+            with open(f'{path}.tmp','w') as f:
+                f.write(sm.srepr(sol))
+            os.replace(f'{path}.tmp',path)
+
+    solutions[key] = sol
+    return sol
+
+def printfoc(sol,backend):
+    """ print a solution as source code for the numpy or numexpr backend """
+
+    if backend == 'numexpr':
+        from sympy.printing.lambdarepr import NumExprPrinter
+        return NumExprPrinter().doprint(sol)
+
+    from sympy.printing.numpy import NumPyPrinter
+    return NumPyPrinter().doprint(sol)
+
+def compilefoc(objective,x,args,use_numexpr=False,cache_dir=CACHE_DIR):
+    """ compile the solution of the FOC of an objective given as text, memoized in memory and on disk """
+
+    # a. backend, numexpr is optional
+    backend = 'numpy'
+    if use_numexpr:
+        try:
+            import numexpr
+            backend = 'numexpr'
+        except ImportError:
+            pass
+
+    # b. key on the text and the backend, no sympy needed when the solution is cached
+    key = hashlib.sha256(repr((objective,x,tuple(args),backend)).encode()).hexdigest()
+
+    if key in compiled:
+        return compiled[key]
+
+    # c. source code from the printer of the backend, the cache directory is trusted like the module itself
+    if key not in sources:
+
+        path = None if cache_dir is None else os.path.join(cache_dir,f'{key}.py')
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                sources[key] = f.read()
+
+        else:
+            import sympy as sm
+            symbols = {name:sm.Symbol(name) for name in (x,)+tuple(args)}
+            sol = solvefoc(sm.sympify(objective,locals=symbols),symbols[x],cache_dir=cache_dir)
+            sources[key] = f'lambda {",".join(args)}: ({printfoc(sol,backend)})'
+
+            if path is not None:
+                os.makedirs(cache_dir,exist_ok=True)
+                with open(f'{path}.tmp','w') as f:
+                    f.write(sources[key])
+                os.replace(f'{path}.tmp',path)
+
+    # d. compile once, the printed code refers to the numpy, functools and numexpr modules by name
+    import functools
+    namespace = dict(numpy=np,functools=functools)
+    if backend == 'numexpr':
+        namespace['numexpr'] = numexpr
+    compiled[key] = eval(sources[key],namespace)
+
+    return compiled[key]
+
+def initchunkmodel(model):
+    """ store the model that worker processes solve chunks with """
+
+    global chunkmodel
+    chunkmodel = model
+
+def simulatechunk(task, model=None):
+    """ draw theta and solve wages for one chunk, writing into shared memory """
+
+    names, N, start, stop, seedseq, method = task
+
+    # a. the caller's model in process, a copy of it in worker processes
+    model = chunkmodel if model is None else model
+    val = model.val
+
+    # b. attach to the output arrays
+    shms = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        theta_vec, w = [np.ndarray((N,), dtype=np.float64, buffer=shm.buf) for shm in shms]
+
+        # c. the chunk's own random stream makes the draws independent of the worker
+        rng = np.random.default_rng(seedseq)
+        theta_vec[start:stop] = rng.normal(val.theta_mean, val.theta_std, stop-start)
+        w[start:stop] = model.solvewages(theta_vec[start:stop], method=method)
+
+        del theta_vec, w
+    finally:
+        for shm in shms:
+            shm.close()
+
+chunkmodel = None
 
 class NashBargainingClass:
     
     def __init__(self):
         """ setup model """
 
-        par = self.par = SimpleNamespace()
+        self._par = None
         val = self.val = SimpleNamespace()
 
-        # model parameters for analytical solution
-        par.w = sm.symbols('w')
-        par.theta = sm.symbols('theta')
-        par.d1 = sm.symbols('d1')
-        par.d2 = sm.symbols('d2') 
-        par.alpha = sm.symbols('alpha')
-
         # model parameter values for numerical solution
         val.theta = 60
         val.d1 = 10
@@ -29,13 +154,52 @@ class NashBargainingClass:
         val.alpha = 1/3
         val.alpha_vec = np.linspace(0,1,10)
 
-        np.random.seed(100) 
+        val.seed = 100
         val.N = 10000
-        val.theta_vec = np.random.normal(60, 10, val.N)
+        val.theta_mean = 60
+        val.theta_std = 10
+        rng = np.random.default_rng(np.random.SeedSequence(val.seed))
+        val.theta_vec = rng.normal(val.theta_mean, val.theta_std, val.N)
         val.m = 20
 
-    def analyticalsolution(self):
+        # cache of wage histograms for the interactive plot
+        self.histograms = OrderedDict()
+        self.histogramlock = threading.Lock()
+
+    def __getstate__(self):
+        """ state sent to worker processes, without the histogram cache and its lock """
+
+        state = self.__dict__.copy()
+        del state['histograms'], state['histogramlock']
+        return state
+
+    def __setstate__(self, state):
+        """ restore state with an empty histogram cache """
+
+        self.__dict__.update(state)
+        self.histograms = OrderedDict()
+        self.histogramlock = threading.Lock()
+
+    @property
+    def par(self):
+        """ model parameters for analytical solution, created on first use """
+
+        if self._par is None:
+            import sympy as sm
+
+            par = self._par = SimpleNamespace()
+            par.w = sm.symbols('w')
+            par.theta = sm.symbols('theta')
+            par.d1 = sm.symbols('d1')
+            par.d2 = sm.symbols('d2') 
+            par.alpha = sm.symbols('alpha')
+
+        return self._par
+
+    def analyticalsolution(self,include_d2=False):
         """ solve the Nash bargaining problem analytically """
+
+        import sympy as sm
     
         par = self.par
 
@@ -44,33 +208,142 @@ class NashBargainingClass:
         u2 = par.theta - par.w
 
         # b. define the object
-        objective = ((u1-par.d1)**par.alpha)*(u2)**(1-par.alpha)
+        if include_d2:
+            objective = ((u1-par.d1)**par.alpha)*(u2-par.d2)**(1-par.alpha)
+        else:
+            objective = ((u1-par.d1)**par.alpha)*(u2)**(1-par.alpha)
 
         # c. find the solution as the wage where the differentiated objective equals zero (FOC)
-        foc = sm.diff(objective,par.w)
-        sol = sm.solve(foc,par.w)[0]
+        sol = solvefoc(objective,par.w)
 
         sol_collected = sm.collect(sol, par.d1)
     
         return sol_collected
+
+    def wagefunction(self,use_numexpr=False):
+        """ compile the analytical solution to a vectorized function of (theta,d1,d2,alpha) """
+
+        return compilefoc(NASH_OBJECTIVE,'w',('theta','d1','d2','alpha'),use_numexpr=use_numexpr)
+
+    def solvewages(self,theta_vec,lower=None,method='analytical',tol=1e-8,maxiter=100,alpha=None,d1=None,d2=None):
+        """ solve the Nash bargaining problem for a vector of match productivities """
+
+        val = self.val
+        theta_vec = np.asarray(theta_vec,dtype=float)
+
+        # a. parameters, by default from val
+        alpha = val.alpha if alpha is None else alpha
+        d1 = val.d1 if d1 is None else d1
+        d2 = val.d2 if d2 is None else d2
+
+        # b. lower bound on the wage
+        lower = d1 if lower is None else lower
+
+        if method == 'analytical':
+
+            # i. interior solution, the Nash product is concave so the bound binds otherwise
+            w = self.wagefunction()(theta_vec,d1,d2,alpha)
+            w = np.maximum(w,lower)
+
+        elif method == 'numerical':
+
+            # i. root of the first-order condition for all matches at once
+            w = self.rootfoc(theta_vec,lower,theta_vec-d2,alpha=alpha,d1=d1,d2=d2,tol=tol,maxiter=maxiter)
+
+        else:
+            raise ValueError(f'unknown method: {method}')
+
+        return w
     
+    def rootfoc(self,theta_vec,lower,upper,alpha=None,d1=None,d2=None,tol=1e-8,maxiter=100):
+        """ solve the first-order condition of the Nash product for arrays of matches """
+
+        val = self.val
+
+        # a. parameters, by default from val
+        alpha = val.alpha if alpha is None else alpha
+        d1 = val.d1 if d1 is None else d1
+        d2 = val.d2 if d2 is None else d2
+
+        arrays = np.broadcast_arrays(*np.atleast_1d(theta_vec,lower,upper,alpha,d1,d2))
+        shape = arrays[0].shape
+        theta_vec,lower,upper,alpha,d1,d2 = [np.array(x,dtype=float).ravel() for x in arrays]
+
+        def foc(w,i):
+            """ derivative of the log Nash product for the matches in i """
+
+            h = 1e-6*np.maximum(1,np.abs(w))
+            du1 = (self.utility_1(w+h)-self.utility_1(w-h))/(2*h)
+            du2 = (self.utility_2(w+h,theta_vec[i])-self.utility_2(w-h,theta_vec[i]))/(2*h)
+            with np.errstate(divide='ignore',invalid='ignore'):
+                return alpha[i]*du1/(self.utility_1(w)-d1[i]) + (1-alpha[i])*du2/(self.utility_2(w,theta_vec[i])-d2[i])
+
+        # b. corner solution where the Nash product falls from the lower bound
+        everyone = np.arange(theta_vec.size)
+        corner = foc(lower,everyone) <= 0
+
+        # c. bracket and initial guess
+        a = lower.copy()
+        b = upper.copy()
+        w = np.where(corner,lower,(a+b)/2)
+
+        # d. safeguarded Newton iterations on the matches that have not converged
+        active = np.nonzero(~corner)[0]
+        for _ in range(maxiter):
+
+            if active.size == 0:
+                break
+
+            # i. value and derivative of the FOC
+            wi = w[active]
+            g = foc(wi,active)
+            h = 1e-6*np.maximum(1,np.abs(wi))
+            dg = (foc(wi+h,active)-foc(wi-h,active))/(2*h)
+
+            # ii. the FOC is decreasing, so its sign tells which side the root is on
+            a[active] = np.where(g > 0,wi,a[active])
+            b[active] = np.where(g > 0,b[active],wi)
+
+            # iii. Newton step, bisection if it leaves the bracket
+            with np.errstate(divide='ignore',invalid='ignore'):
+                step = g/dg
+            w_new = wi-step
+            outside = ~((w_new >= a[active]) & (w_new <= b[active]))
+            w_new = np.where(outside,(a[active]+b[active])/2,w_new)
+
+            # iv. stop iterating on matches with a tiny Newton step or bracket
+            converged = (np.abs(step) < tol*(1+np.abs(wi))) | (b[active]-a[active] < tol*(1+np.abs(wi)))
+            w[active] = np.where(converged,np.clip(wi-step,a[active],b[active]),w_new)
+            active = active[~converged]
+
+        return w.reshape(shape)
+
     def utility_1(self,w):
         """ calculate utility of worker """
 
         val = self.val
         return w
     
-    def utility_2(self,w):
-        """ calculate utility of worker """
+    def utility_2(self,w,theta=None):
+        """ calculate utility of firm """
 
         val = self.val
-        return val.theta - w
+        theta = val.theta if theta is None else theta
+        return theta - w
     
-    def numericalsolution(self):
+    def numericalsolution(self,method='foc'):
         """ solve the Nash bargaining problem numerically"""
     
         val = self.val
 
+        # the batched first-order condition solver or the compiled analytical solution replace the optimizer
+        if method == 'foc':
+            return float(self.rootfoc(val.theta,val.d1,val.theta-val.d2)[0])
+        elif method == 'analytical':
+            return float(self.wagefunction()(val.theta,val.d1,val.d2,val.alpha))
+        elif method != 'nelder-mead':
+            raise ValueError(f'unknown method: {method}')
+
         # a. objective function
         obj = lambda w: -(((self.utility_1(w)-val.d1)**val.alpha)*((self.utility_2(w)-val.d2)**(1-val.alpha)))
 
@@ -79,6 +352,7 @@ class NashBargainingClass:
         initial_guess = val.d1
 
         # c. maximize surplus
+        from scipy import optimize
         result = optimize.minimize(obj, initial_guess, bounds=bounds, method='Nelder-Mead') 
 
         w = result.x[0]
@@ -97,118 +371,297 @@ class NashBargainingClass:
             w = self.numericalsolution()
             w_values.append(w)
         
-        # Create a new figure
-        fig = plt.figure()
-        ax = fig.add_subplot(1,1,1)
-
-        ax.plot(val.alpha_vec, w_values)
-        ax.set_xlabel('Alpha')
-        ax.set_ylabel('Wage')
-        ax.set_title('Wage as a function of alpha')
-
-        specific_alpha = 1/3
-        specific_wage = 26.7
-        ax.scatter(specific_alpha, specific_wage, color='red', s=100, zorder=5, label='Numerical solution')
-
-        ax.grid(True)
-        plt.legend()
-        plt.show()
+        # Plot
+        import modelplots
+        modelplots.plotvaryingalpha(val.alpha_vec, w_values)
     
-    def simulatewdistribution(self, min, max):
+    def simulatewdistribution(self, min, max, method='numerical'):
         """ simulate wage distribution """
 
         val = self.val
 
-        w_values = []  # Store w values for each individual
-        
-        for theta in val.theta_vec:
-            # a. Objective function
-            obj = lambda w: -(((self.utility_1(w)-val.d1)**val.alpha)*((theta-w-val.d2)**(1-val.alpha)))
-            
-            # b. initial guess and bounds
-            bounds = [(val.d1, theta)]
-            initial_guess = val.d1
+        # Solve for the wage of every individual at once
+        w_values = self.solvewages(val.theta_vec,method=method)
 
-            # c. maximize surplus
-            result = optimize.minimize(obj, initial_guess, bounds=bounds, method='Nelder-Mead') 
+        # Plot the distribution of w
+        import modelplots
+        modelplots.plotwages(w_values, min, max, 'Distribution of Wages')
 
-            w = result.x[0]
-            w_values.append(w)
+    def simulatestream(self, N, min, max, bins=100, chunk=1_000_000, seed=100, qbins=100_000, quantiles=(0.1,0.25,0.5,0.75,0.9), method='analytical', do_plot=True):
+        """ simulate wage distribution for N workers in chunks of constant memory """
 
-        # Plot the distribution of w
-        plt.hist(w_values, bins=100, range=(min, max))  
-        plt.xlabel('Wage')
-        plt.ylabel('Frequency')
-        plt.title('Distribution of Wages')
-        plt.grid(alpha=0.3)
-        plt.show()
+        val = self.val
+        rng = np.random.default_rng(seed)
+
+        # a. running statistics
+        edges = np.linspace(min, max, bins+1)
+        counts = np.zeros(bins, dtype=np.int64)
+        n = 0
+        mean = 0.0
+        M2 = 0.0
+        w_min = np.inf
+        w_max = -np.inf
+
+        # fine histogram as quantile sketch, its range is set by the first chunk
+        qedges = None
+
+        for start in range(0, N, chunk):
+
+            # b. draw and solve the chunk
+            theta_vec = rng.normal(val.theta_mean, val.theta_std, size=np.minimum(chunk, N-start))
+            w = self.solvewages(theta_vec, method=method)
+
+            # c. histogram
+            counts += np.histogram(w, bins=edges)[0]
+
+            # d. mean and variance, merging chunk moments (Chan et al.)
+            n_chunk = w.size
+            mean_chunk = w.mean()
+            M2_chunk = ((w-mean_chunk)**2).sum()
+
+            delta = mean_chunk-mean
+            n_total = n+n_chunk
+            mean += delta*n_chunk/n_total
+            M2 += M2_chunk+delta**2*n*n_chunk/n_total
+            n = n_total
+
+            w_min = np.minimum(w_min, w.min())
+            w_max = np.maximum(w_max, w.max())
+
+            # e. quantile sketch, values outside the range go to the end bins
+            if qedges is None:
+                span = w.max()-w.min()
+                qedges = np.linspace(w.min()-span, w.max()+span, qbins+1)
+                qcounts = np.zeros(qbins, dtype=np.int64)
+            qcounts += np.bincount(np.clip(np.searchsorted(qedges, w, side='right')-1, 0, qbins-1), minlength=qbins)
+
+        # f. quantiles by interpolating the cumulative sketch, accurate to the sketch bin width
+        cdf = np.concatenate(([0], np.cumsum(qcounts)))/n
+        quantiles = {q: np.interp(q, cdf, qedges) for q in quantiles}
+
+        sim = SimpleNamespace(N=n, counts=counts, edges=edges, mean=mean, std=np.sqrt(M2/(n-1)), min=w_min, max=w_max, quantiles=quantiles)
+
+        if do_plot:
+            import modelplots
+            modelplots.plotcounts(counts, edges, 'Distribution of Wages')
+
+        return sim
+
+    def simulateparallel(self, N, chunk=1_000_000, workers=1, seed=None, method='analytical'):
+        """ draw theta and solve wages for N workers in parallel chunks """
+
+        val = self.val
+        seed = val.seed if seed is None else seed
+
+        # a. one random stream per chunk, so results do not depend on the number of workers
+        starts = list(range(0, N, chunk))
+        seedseqs = np.random.SeedSequence(seed).spawn(len(starts))
+
+        # b. shared output arrays
+        shms = [shared_memory.SharedMemory(create=True, size=max(N, 1)*8) for _ in range(2)]
+        try:
+            names = [shm.name for shm in shms]
+            tasks = [(names, N, start, np.minimum(start+chunk, N), seedseq, method) for start, seedseq in zip(starts, seedseqs)]
+
+            # c. solve chunks on this model, or on one copy of it per worker process
+            if workers == 1:
+                for task in tasks:
+                    simulatechunk(task, self)
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=initchunkmodel, initargs=(self,)) as executor:
+                    list(executor.map(simulatechunk, tasks))
+
+            # d. copy out before releasing the shared memory
+            theta_vec, w = [np.ndarray((N,), dtype=np.float64, buffer=shm.buf).copy() for shm in shms]
+
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+        return theta_vec, w
+
+    def policysurface(self, alpha, d1, d2, m, theta_vec=None, quantiles=(0.1,0.5,0.9), chunk=100_000):
+        """ mean wage, employment share and wage quantiles on a grid of (alpha,d1,d2,m) """
+
+        val = self.val
+
+        # a. sorted productivities and their cumulative sums
+        theta_vec = val.theta_vec if theta_vec is None else theta_vec
+        theta_sorted = np.sort(theta_vec)
+        theta_cumsum = np.concatenate(([0], np.cumsum(theta_sorted)))
+        N = theta_sorted.size
+
+        # b. flattened grid
+        grid = [np.atleast_1d(np.asarray(x, dtype=float)) for x in (alpha, d1, d2, m)]
+        shape = tuple(x.size for x in grid)
+        alpha, d1, d2, m = [x.ravel() for x in np.meshgrid(*grid, indexing='ij')]
+
+        quantiles = np.asarray(quantiles)
+        mean_wage = np.empty(alpha.size)
+        employment = np.empty(alpha.size)
+        wage_quantiles = np.empty((alpha.size, quantiles.size))
+
+        wage = self.wagefunction()
+
+        for start in range(0, alpha.size, chunk):
+            sl = slice(start, start+chunk)
+
+            # c. the interior wage is linear in theta: w = intercept + slope*theta
+            intercept = wage(0.0, d1[sl], d2[sl], alpha[sl])
+            slope = wage(1.0, d1[sl], d2[sl], alpha[sl])-intercept
+
+            # d. matches are formed when the surplus is positive and the firm can pay m and keep d2, as in solvematches
+            k = np.searchsorted(theta_sorted, np.maximum(d1[sl], m[sl])+d2[sl], side='left')
+            employed = N-k
+            employment[sl] = employed/N
+
+            # e. the minimum wage binds for theta below theta_bar
+            with np.errstate(divide='ignore', invalid='ignore'):
+                theta_bar = np.where(slope > 0, (m[sl]-intercept)/slope, np.where(intercept >= m[sl], -np.inf, np.inf))
+            j = np.maximum(np.searchsorted(theta_sorted, theta_bar, side='left'), k)
+
+            # f. mean wage of the employed from the cumulative sums
+            total = m[sl]*(j-k) + slope*(theta_cumsum[N]-theta_cumsum[j]) + intercept*(N-j)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean_wage[sl] = np.where(employed > 0, total/employed, np.nan)
+
+            # g. quantiles, wages are increasing in theta so they follow the order of theta_sorted
+            pos = k[:, None] + quantiles[None, :]*np.maximum(employed-1, 0)[:, None]
+            lo = np.minimum(np.floor(pos).astype(int), N-1)
+            hi = np.minimum(lo+1, N-1)
+            frac = pos-np.floor(pos)
+
+            w_lo = np.maximum(intercept[:, None]+slope[:, None]*theta_sorted[lo], m[sl, None])
+            w_hi = np.maximum(intercept[:, None]+slope[:, None]*theta_sorted[hi], m[sl, None])
+            wage_quantiles[sl] = np.where(employed[:, None] > 0, w_lo+frac*(w_hi-w_lo), np.nan)
+
+        return SimpleNamespace(mean_wage=mean_wage.reshape(shape), employment=employment.reshape(shape),
+                               quantiles=quantiles, wage_quantiles=wage_quantiles.reshape(shape+(quantiles.size,)))
+
+    def drawmatches(self, N, seed=100, ntypes=3, alpha_mean=1/3, alpha_precision=20, d1_mean=10, d1_std=3, d2_mean=0, d2_std=0, corr=None):
+        """ draw a population of matches with their own theta, alpha, d1 and d2 """
+
+        val = self.val
+        rng = np.random.default_rng(seed)
+
+        # a. correlated standard normals for (theta,alpha,d1,d2), a Gaussian copula
+        corr = np.eye(4) if corr is None else np.asarray(corr)
+        z = rng.standard_normal((N, 4))@np.linalg.cholesky(corr).T
+
+        # b. marginal distributions
+        pop = SimpleNamespace()
+        pop.theta = val.theta_mean + val.theta_std*z[:, 0]
+        a = alpha_mean*alpha_precision
+        b = (1-alpha_mean)*alpha_precision
+        from scipy import stats
+        pop.alpha = stats.beta.ppf(stats.norm.cdf(z[:, 1]), a, b)
+        pop.d1 = self.truncatednormal(z[:, 2], d1_mean, d1_std)
+        pop.d2 = self.truncatednormal(z[:, 3], d2_mean, d2_std)
+
+        # c. worker types
+        pop.type = rng.integers(0, ntypes, size=N)
+
+        return pop
+
+    def truncatednormal(self, z, mean, std):
+        """ map standard normals to a normal truncated below at zero """
+
+        if std == 0:
+            return np.full(z.shape, float(mean))
+
+        # the copula uniforms are mapped through the inverse cdf of the truncated distribution
+        from scipy import stats
+        return stats.truncnorm.ppf(stats.norm.cdf(z), -mean/std, np.inf, loc=mean, scale=std)
+
+    def solvematches(self, pop, m=None):
+        """ solve the Nash bargaining problem for every match in a population """
+
+        # a. interior solution
+        w = self.wagefunction()(pop.theta, pop.d1, pop.d2, pop.alpha)
+
+        # b. matches with a positive surplus that can pay the minimum wage and still leave the firm its threat point
+        matched = pop.theta >= pop.d1 + pop.d2
+        binding = np.zeros(pop.theta.shape, dtype=bool)
+        if m is not None:
+            matched &= pop.theta - pop.d2 >= m
+
+            # corner solution where the minimum wage binds
+            binding = matched & (w < m)
+            w = np.maximum(w, m)
+
+        sol = SimpleNamespace()
+        sol.w = np.where(matched, w, np.nan)
+        sol.matched = matched
+        sol.binding = binding
+
+        return sol
+
+    def groupstats(self, pop, sol, ntypes=None):
+        """ summary statistics of a solved population by worker type """
+
+        ntypes = pop.type.max()+1 if ntypes is None else ntypes
+
+        # a. sums by type
+        count = np.bincount(pop.type, minlength=ntypes)
+        matched = np.bincount(pop.type, weights=sol.matched, minlength=ntypes)
+        binding = np.bincount(pop.type, weights=sol.binding, minlength=ntypes)
+        w = np.where(sol.matched, sol.w, 0)
+        w_sum = np.bincount(pop.type, weights=w, minlength=ntypes)
+        w2_sum = np.bincount(pop.type, weights=w**2, minlength=ntypes)
+
+        # b. statistics
+        summary = SimpleNamespace()
+        summary.count = count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summary.employment = matched/count
+            summary.binding = binding/matched
+            summary.mean_wage = w_sum/matched
+            summary.std_wage = np.sqrt(np.maximum(w2_sum/matched - summary.mean_wage**2, 0))
+
+        return summary
+
+    def wagehistogram(self, alpha, d1, min=0, max=100, bins=100, maxsize=4096):
+        """ histogram of simulated wages for (alpha,d1), cached with LRU eviction """
+
+        key = (round(alpha, 6), d1, min, max, bins)
+
+        # a. reuse earlier histogram
+        with self.histogramlock:
+            if key in self.histograms:
+                self.histograms.move_to_end(key)
+                return self.histograms[key]
+
+        # b. simulate without touching val, so it is safe on a background thread
+        w = self.solvewages(self.val.theta_vec, alpha=alpha, d1=d1)
+        histogram = np.histogram(w, bins=bins, range=(min, max))
+
+        # c. store and evict the least recently used histogram
+        with self.histogramlock:
+            self.histograms[key] = histogram
+            if len(self.histograms) > maxsize:
+                self.histograms.popitem(last=False)
+
+        return histogram
 
     def interactive_plot(self):
         """ Interactive plot for exploring Nash Bargaining Model """
-        
-        def update(change):
-            clear_output(wait=True)
-            display(alpha_slider, d1_slider, update_button)
-            self.val.alpha = alpha_slider.value
-            self.val.d1 = d1_slider.value
-            wage = self.numericalsolution()
-
-            # Simulate distribution of wages
-            self.simulatewdistribution(min = 0, max = 100)
-
-        # Customize slider width and description width
-        slider_layout = Layout(width='600px', margin='0px 0px 0px 20px')  # Adjust the left margin as needed
-        description_width = 'initial'  # This setting helps to avoid cutting off the descriptions
-
-        alpha_slider = widgets.FloatSlider(
-        value=1/3, min=0, max=1, step=0.01,
-        description='Alpha: Bargaining power of the worker',
-        style={'description_width': description_width},
-          layout=slider_layout
-        )
-
-        d1_slider = widgets.IntSlider(
-        value=10, min=0, max=20, step=1,
-        description='d1: Threat Point',
-        style={'description_width': description_width},
-        layout=slider_layout
-        )
-
-        # Button to trigger the update
-        update_button = Button(description='Update Results')
-        update_button.on_click(update)
-        
-        # Display widgets
-        display(alpha_slider, d1_slider, update_button)
 
-    def minimumwage(self):
+        import modelplots
+        modelplots.interactive_plot(self)
+
+    def minimumwage(self, method='numerical'):
             """ simulate wage distribution with a minimum wage """
 
             val = self.val
             val.alpha = 1/3 #redefine the value of alpha
             val.d1 = 10 #redefine the value of d1
 
-            w_values = []  # Store w values for each individual
-            
-            for theta in val.theta_vec:
-                if theta >= val.m:
-                    # a. Objective function
-                    obj = lambda w: -(((self.utility_1(w)-val.d1)**val.alpha)*((theta-w-val.d2)**(1-val.alpha)))
-                
-                    # b. initial guess and bounds
-                    bounds = [(val.m, theta)]
-                    initial_guess = val.m
-
-                    # c. maximize surplus
-                    result = optimize.minimize(obj, initial_guess, bounds=bounds, method='Nelder-Mead') 
-
-                    w = result.x[0]
-                    w_values.append(w)
+            # Only matches with theta above the minimum wage are formed
+            theta_vec = val.theta_vec[val.theta_vec >= val.m]
+            w_values = self.solvewages(theta_vec,lower=val.m,method=method)
 
             # Plot the distribution of w
-            plt.hist(w_values, bins=100, range=(15, 40)) 
-            plt.xlabel('Wage')
-            plt.ylabel('Frequency')
-            plt.title('Distribution of Wages with a Minimum Wage')
-            plt.grid(alpha=0.3)
-            plt.show()
+            import modelplots
+            modelplots.plotwages(w_values, 15, 40, 'Distribution of Wages with a Minimum Wage')
+
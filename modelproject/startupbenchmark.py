@@ -0,0 +1,45 @@
+import os
+import sys
+import subprocess
+
+# modules the solver core used to import eagerly
+HEAVY = ('sympy','matplotlib','IPython','ipywidgets')
+
+CASES = {
+    'solver core': 'import modelproject',
+    'solver core + plots': 'import modelproject, modelplots',
+    'old eager imports': 'import modelproject, sympy, matplotlib.pyplot, IPython.display, ipywidgets',
+    'closed-form solve': 'import modelproject; modelproject.NashBargainingClass().solvewages([60.0])',
+}
+
+def importtime(statement):
+    """ wall time of running statement in a fresh interpreter, and the heavy modules it loaded """
+
+    code = (
+        'import time; t0 = time.perf_counter()\n'
+        f'{statement}\n'
+        'import sys; print(time.perf_counter()-t0); '
+        f'print(",".join(m for m in {HEAVY!r} if m in sys.modules))'
+    )
+    out = subprocess.run([sys.executable,'-c',code],cwd=os.path.dirname(os.path.abspath(__file__)),capture_output=True,text=True,check=True).stdout.split('\n')
+    return float(out[0]),out[1]
+
+def startup_benchmark(repeats=5,do_print=True):
+    """ median startup time of every case """
+
+    results = {}
+    for name,statement in CASES.items():
+        times = []
+        for _ in range(repeats):
+            seconds,loaded = importtime(statement)
+            times.append(seconds)
+
+        results[name] = dict(seconds=sorted(times)[len(times)//2],loaded=loaded)
+
+        if do_print:
+            print(f'{name:20s}: {results[name]["seconds"]*1000:8.1f} ms, heavy modules loaded: {loaded or "none"}')
+
+    return results
+
+if __name__ == '__main__':
+    startup_benchmark()